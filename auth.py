@@ -0,0 +1,221 @@
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import httpx
+import jwt
+
+HMAC_ALGORITHMS = ["HS256", "HS384", "HS512"]
+ASYMMETRIC_ALGORITHMS = ["RS256", "RS384", "RS512", "ES256", "ES384", "ES512", "EdDSA"]
+
+
+class InvalidToken(Exception):
+    """Raised when a bearer token cannot be verified."""
+
+
+class AuthUnavailable(InvalidToken):
+    """
+    Signing keys or the remote lookup could not be fetched (network, upstream
+    error); not a verdict on the token. Callers that tell the two apart should
+    catch this first.
+    """
+
+
+class TokenCache:
+    """Bounded LRU of verified tokens -> user_id, each entry with its own expiry."""
+
+    def __init__(self, maxsize=1024, ttl=300, clock=time.time):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token):
+        # Keep digests rather than raw bearer tokens in memory.
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token):
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            user_id, expires_at = entry
+            if expires_at <= self.clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return user_id
+
+    def set(self, token, user_id, exp=None):
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        expires_at = self.clock() + self.ttl
+        if exp is not None:
+            expires_at = min(expires_at, exp)
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (user_id, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class JWKSCache:
+    """Signing keys fetched from a JWKS endpoint, refreshed on TTL expiry or unknown kid."""
+
+    def __init__(self, url, ttl=3600, min_refresh_interval=30, http=None, fetch=None, clock=time.time):
+        self.url = url
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.http = http
+        self.clock = clock
+        self._fetch = fetch or self._fetch_url
+        self._keys = {}
+        self._fetched_at = None
+        self._lock = asyncio.Lock()
+
+    async def _fetch_url(self):
+        if self.http is None:
+            async with httpx.AsyncClient(timeout=5) as http:
+                resp = await http.get(self.url)
+        else:
+            resp = await self.http.get(self.url, timeout=5)
+        resp.raise_for_status()
+        return resp.json()
+
+    async def _refresh(self):
+        jwks = await self._fetch()
+        keys = {}
+        for jwk in jwks.get("keys", []):
+            try:
+                key = jwt.PyJWK(jwk)
+            except jwt.PyJWTError:
+                continue
+            keys[jwk.get("kid")] = key
+        self._keys = keys
+        self._fetched_at = self.clock()
+
+    async def get_key(self, kid):
+        async with self._lock:
+            now = self.clock()
+            stale = self._fetched_at is None or now - self._fetched_at >= self.ttl
+            # An unknown kid usually means the keys were rotated; refetch, but
+            # not more often than min_refresh_interval so forged kids can't hammer the endpoint.
+            unknown = kid not in self._keys and (
+                self._fetched_at is None or now - self._fetched_at >= self.min_refresh_interval
+            )
+            if stale or unknown:
+                try:
+                    await self._refresh()
+                except Exception as exc:
+                    if not self._keys:
+                        raise AuthUnavailable("Unable to fetch signing keys") from exc
+            key = self._keys.get(kid)
+        if key is None:
+            raise InvalidToken("Unknown signing key")
+        return key
+
+
+class TokenVerifier:
+    """
+    Verify Supabase access tokens locally (signature, expiry, audience) and
+    cache the resulting user_id. HS* tokens are checked against the project
+    JWT secret, asymmetric tokens against the JWKS. If remote_lookup (a coroutine
+    function) is given, tokens that fail local verification are handed to it;
+    tokens it rejects are remembered for negative_ttl seconds so expired or
+    forged tokens don't cost a round-trip each time.
+    """
+
+    def __init__(self, secret=None, jwks=None, audience="authenticated", issuer=None,
+                 leeway=0, cache=None, remote_lookup=None, negative_ttl=30):
+        self.secret = secret
+        self.jwks = jwks
+        self.audience = audience
+        self.issuer = issuer
+        self.leeway = leeway
+        self.cache = cache if cache is not None else TokenCache()
+        self.remote_lookup = remote_lookup
+        self.rejected = TokenCache(maxsize=self.cache.maxsize, ttl=negative_ttl)
+
+    def warnings(self):
+        """Configuration problems worth reporting at startup."""
+        if not self.secret and self.remote_lookup is None:
+            return [
+                "No JWT secret configured and remote lookup is off: HS256-signed tokens "
+                "(legacy Supabase projects) will all be rejected."
+            ]
+        return []
+
+    async def verify(self, token):
+        user_id = self.cache.get(token)
+        if user_id is not None:
+            return user_id
+
+        try:
+            claims = await self._decode(token)
+        except InvalidToken:
+            if self.remote_lookup is None:
+                raise
+            if self.rejected.get(token):
+                raise InvalidToken("Invalid token or user not found")
+            try:
+                user_id = await self.remote_lookup(token)
+            except AuthUnavailable:
+                raise
+            except InvalidToken:
+                user_id = None
+            if not user_id:
+                self.rejected.set(token, True)
+                raise InvalidToken("Invalid token or user not found")
+            self.cache.set(token, user_id, self._unverified_exp(token))
+            return user_id
+
+        self.cache.set(token, claims["sub"], claims.get("exp"))
+        return claims["sub"]
+
+    async def _decode(self, token):
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.PyJWTError as exc:
+            raise InvalidToken("Malformed token") from exc
+
+        alg = header.get("alg")
+        if alg in HMAC_ALGORITHMS:
+            if not self.secret:
+                raise InvalidToken("No JWT secret configured")
+            key = self.secret
+        elif alg in ASYMMETRIC_ALGORITHMS:
+            if self.jwks is None:
+                raise InvalidToken("No JWKS configured")
+            key = await self.jwks.get_key(header.get("kid"))
+        else:
+            raise InvalidToken("Unsupported token algorithm")
+
+        try:
+            claims = jwt.decode(
+                token,
+                key,
+                algorithms=[alg],
+                audience=self.audience,
+                issuer=self.issuer,
+                leeway=self.leeway,
+                options={"require": ["exp", "sub"]},
+            )
+        except jwt.PyJWTError as exc:
+            raise InvalidToken(str(exc)) from exc
+        return claims
+
+    @staticmethod
+    def _unverified_exp(token):
+        try:
+            return jwt.decode(token, options={"verify_signature": False}).get("exp")
+        except jwt.PyJWTError:
+            return None
@@ -0,0 +1,106 @@
+"""
+Pantry latency while slow LLM generations are in flight.
+
+Fires --llm-calls concurrent /api/recipes requests against a stub OpenRouter
+that takes --llm-latency seconds, then measures /pantry/list latency. Each
+generation comes from its own user and pantry, so the recipe cache can't
+coalesce them into one upstream call. With the
+async app, pantry reads stay near the stub DB latency; the sync baseline (the
+old threadpool design: sync routes + blocking HTTP client) queues them behind
+the LLM calls once the threadpool (40 threads) is exhausted.
+
+    python -m benchmarks.bench_concurrency --llm-calls 80 --llm-latency 2
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from benchmarks.harness import BackgroundServer, bench_token, configure_app_env, percentile
+from benchmarks.stubs import StubState, create_stub_app
+
+
+def create_sync_baseline(stub_url):
+    """The pre-asyncio shape of main.py: sync routes on Starlette's threadpool."""
+    from fastapi import FastAPI
+
+    app = FastAPI()
+    client = httpx.Client(timeout=None)
+
+    @app.get("/pantry/list")
+    def list_pantry_items():
+        return client.get(f"{stub_url}/rest/v1/pantry", params={"select": "*"}).json()
+
+    @app.get("/api/recipes")
+    def suggest_recipes():
+        client.get(f"{stub_url}/rest/v1/pantry", params={"select": "*"})
+        return client.post(f"{stub_url}/v1/chat/completions", json={}).json()
+
+    return app
+
+
+def generation_user(n):
+    return f"bench-user-{n}"
+
+
+async def run_load(base_url, llm_calls, pantry_calls):
+    headers = {"Authorization": f"Bearer {bench_token()}"}
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=None) as client:
+        llm = [
+            asyncio.create_task(client.get(
+                "/api/recipes", headers={"Authorization": f"Bearer {bench_token(generation_user(n))}"}
+            ))
+            for n in range(llm_calls)
+        ]
+        await asyncio.sleep(0.2)  # let the generations occupy the server
+
+        async def timed_list():
+            start = time.perf_counter()
+            resp = await client.get("/pantry/list")
+            resp.raise_for_status()
+            return time.perf_counter() - start
+
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*(timed_list() for _ in range(pantry_calls)))
+        elapsed = time.perf_counter() - started
+        for resp in await asyncio.gather(*llm):
+            resp.raise_for_status()
+    return latencies, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm-calls", type=int, default=80)
+    parser.add_argument("--pantry-calls", type=int, default=50)
+    parser.add_argument("--llm-latency", type=float, default=2.0)
+    parser.add_argument("--db-latency", type=float, default=0.01)
+    parser.add_argument("--mode", choices=["async", "sync-baseline", "both"], default="both")
+    args = parser.parse_args()
+
+    state = StubState(db_latency=args.db_latency, llm_latency=args.llm_latency)
+    state.seed("bench-user", [{"item": "eggs", "quantity": 6}, {"item": "lettuce", "quantity": 1, "unit": "head"}])
+    for n in range(args.llm_calls):
+        # Distinct pantries too, so no two generations share a fingerprint.
+        state.seed(generation_user(n), [{"item": "eggs", "quantity": n + 1}])
+
+    with BackgroundServer(create_stub_app(state), limit_concurrency=None) as stub:
+        configure_app_env(stub.url)
+        import main as app_module
+
+        modes = ["async", "sync-baseline"] if args.mode == "both" else [args.mode]
+        for mode in modes:
+            app = app_module.app if mode == "async" else create_sync_baseline(stub.url)
+            state.calls["llm"] = 0
+            with BackgroundServer(app) as server:
+                latencies, elapsed = asyncio.run(run_load(server.url, args.llm_calls, args.pantry_calls))
+            print(
+                f"{mode:>13}: /pantry/list with {args.llm_calls} generations in flight -> "
+                f"p50 {percentile(latencies, 50) * 1000:.0f} ms, p99 {percentile(latencies, 99) * 1000:.0f} ms, "
+                f"{args.pantry_calls / elapsed:.0f} req/s ({state.calls['llm']} upstream generations)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Per-endpoint latency and throughput against local stand-ins.
+
+Runs the real app (uvicorn, lifespan and all) against benchmarks.stubs with
+the given Supabase/OpenRouter latency, fires --requests requests per endpoint
+with --concurrency in flight, and reports p50/p99/throughput plus the mean
+server-side breakdown from the Server-Timing header (each span's mean is
+over the requests that ran it). Client, app and stubs share one process, so
+compare runs with each other rather than reading absolute numbers.
+
+    python -m benchmarks.bench_endpoints --db-latency 0.01 --llm-latency 0.5
+    python -m benchmarks.bench_endpoints --no-cache --endpoints list,recipes
+
+With --no-cache the LLM endpoints also send each request as its own user with
+its own pantry, since identical concurrent generations would otherwise still
+be coalesced into one upstream call.
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+from benchmarks.harness import BENCH_METRICS_TOKEN, BackgroundServer, bench_token, configure_app_env, percentile
+from benchmarks.stubs import StubState, create_stub_app
+
+# Ops endpoints take the metrics token instead of the bench user's JWT.
+OPS_HEADERS = {"Authorization": f"Bearer {BENCH_METRICS_TOKEN}"}
+
+# Reads run before writes so the caches (when on) see a stable pantry.
+ENDPOINTS = {
+    "list": ("GET", "/pantry/list", None),
+    "list-page": ("GET", "/pantry/list?limit=10&sort=item", None),
+    "recipes": ("GET", "/api/recipes", None),
+    "recipes-local": ("GET", "/api/recipes?engine=local", None),
+    "recipes-stream": ("GET", "/api/recipes/stream", None),
+    "update": ("PATCH", "/pantry/update/1", {"quantity": 3}),
+    "add": ("POST", "/pantry/add", {"item": "bench item", "quantity": 1}),
+    "metrics": ("GET", "/metrics", None),
+}
+
+# Endpoints whose identical concurrent requests share one generation.
+LLM_ENDPOINTS = {"recipes", "recipes-stream"}
+
+PANTRY = ["eggs", "milk", "butter", "flour", "rice", "tomatoes", "onion", "garlic", "cheese", "bread", "potatoes", "apples"]
+
+
+def parse_server_timing(value):
+    entries = {}
+    for entry in filter(None, (part.strip() for part in value.split(","))):
+        name, _, duration = entry.partition(";dur=")
+        if duration:
+            entries[name] = float(duration)
+    return entries
+
+
+def request_user(n):
+    return f"bench-user-{n}"
+
+
+async def run_endpoint(client, method, path, body, requests, concurrency, headers_for=lambda n: None):
+    latencies, errors, timings = [], 0, {}
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(n):
+        nonlocal errors
+        async with slots:
+            start = time.perf_counter()
+            resp = await client.request(method, path, json=body, headers=headers_for(n))
+            latencies.append(time.perf_counter() - start)
+        if resp.status_code >= 400:
+            errors += 1
+        for name, duration in parse_server_timing(resp.headers.get("Server-Timing", "")).items():
+            timings.setdefault(name, []).append(duration)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(n) for n in range(requests)))
+    elapsed = time.perf_counter() - started
+    return latencies, errors, elapsed, timings
+
+
+async def run_all(base_url, names, requests, concurrency, user_per_request=False):
+    headers = {"Authorization": f"Bearer {bench_token()}"}
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=None) as client:
+        for name in names:
+            method, path, body = ENDPOINTS[name]
+            if name == "metrics":
+                headers_for = lambda n: OPS_HEADERS
+            elif user_per_request and name in LLM_ENDPOINTS:
+                headers_for = lambda n: {"Authorization": f"Bearer {bench_token(request_user(n))}"}
+            else:
+                headers_for = lambda n: None
+            yield name, await run_endpoint(client, method, path, body, requests, concurrency, headers_for)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help="comma-separated: " + ", ".join(ENDPOINTS))
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--db-latency", type=float, default=0.01)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--pantry-size", type=int, default=len(PANTRY))
+    parser.add_argument("--no-cache", action="store_true", help="disable the recipe and pantry caches")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.endpoints.split(",") if name.strip()]
+    unknown = set(names) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(sorted(unknown))}")
+
+    state = StubState(db_latency=args.db_latency, llm_latency=args.llm_latency)
+    items = [PANTRY[i % len(PANTRY)] for i in range(args.pantry_size)]
+    state.seed("bench-user", [{"item": item, "quantity": 2} for item in items])
+    if args.no_cache:
+        for n in range(args.requests):
+            state.seed(request_user(n), [{"item": item, "quantity": n + 1} for item in items])
+
+    with BackgroundServer(create_stub_app(state), limit_concurrency=None) as stub:
+        configure_app_env(stub.url)
+        if args.no_cache:
+            os.environ["RECIPE_CACHE_BACKEND"] = "none"
+            os.environ["PANTRY_CACHE_BACKEND"] = "none"
+        import main as app_module
+
+        print(
+            f"{args.requests} requests/endpoint, {args.concurrency} in flight, "
+            f"db {args.db_latency * 1000:.0f} ms, llm {args.llm_latency * 1000:.0f} ms, "
+            f"caches {'off' if args.no_cache else 'on'}"
+        )
+        print(f"{'endpoint':<15} {'p50 ms':>8} {'p99 ms':>8} {'req/s':>8} {'errors':>6}  server-timing means (ms)")
+        with BackgroundServer(app_module.app) as server:
+
+            async def report():
+                async for name, (latencies, errors, elapsed, timings) in run_all(
+                    server.url, names, args.requests, args.concurrency, user_per_request=args.no_cache
+                ):
+                    breakdown = ", ".join(
+                        f"{span} {sum(values) / len(values):.1f}" for span, values in timings.items()
+                    )
+                    print(
+                        f"{name:<15} {percentile(latencies, 50) * 1000:>8.1f} {percentile(latencies, 99) * 1000:>8.1f} "
+                        f"{len(latencies) / elapsed:>8.0f} {errors:>6}  {breakdown}"
+                    )
+
+            asyncio.run(report())
+
+
+if __name__ == "__main__":
+    main()
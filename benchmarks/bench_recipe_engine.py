@@ -0,0 +1,85 @@
+"""
+Local recipe engine at corpus scale.
+
+Builds a RecipeIndex over --recipes synthetic recipes (ingredients drawn from a
+Zipf-ish vocabulary, so common items like eggs have long postings), then times
+match() for random pantries of --pantry-size items.
+
+    python -m benchmarks.bench_recipe_engine --recipes 100000 --queries 500
+"""
+import argparse
+import random
+import time
+from itertools import accumulate
+
+from benchmarks.harness import percentile
+from recipe_engine import RecipeIndex
+
+BASE = [
+    "egg", "milk", "butter", "flour", "rice", "pasta", "tomato", "onion", "garlic", "chicken",
+    "beef", "pork", "cheese", "potato", "carrot", "pepper", "spinach", "lemon", "bread", "bean",
+]
+
+
+def synthetic_name(n):
+    # Letters only: the normalizer drops digits, and "ingredient 7" would collapse to "ingredient".
+    letters = ""
+    while True:
+        n, rest = divmod(n, 26)
+        letters += "bcdfghjklmnpqrstvwxzaeiouy"[rest]
+        if not n:
+            return f"spice z{letters}"
+
+
+def make_vocabulary(size):
+    return BASE + [synthetic_name(n) for n in range(size - len(BASE))]
+
+
+def make_corpus(count, vocabulary, rng):
+    cum_weights = list(accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+    return [
+        {
+            "title": f"Recipe {n}",
+            "ingredients": list(dict.fromkeys(rng.choices(vocabulary, cum_weights=cum_weights, k=rng.randint(4, 12)))),
+            "instructions": "",
+        }
+        for n in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipes", type=int, default=100_000)
+    parser.add_argument("--vocabulary", type=int, default=2_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--pantry-size", type=int, default=15)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(args.vocabulary)
+    corpus = make_corpus(args.recipes, vocabulary, rng)
+
+    start = time.perf_counter()
+    index = RecipeIndex(corpus)
+    built = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(args.queries):
+        # Mostly common items, plus a few rare ones, like a real pantry.
+        pantry = rng.sample(BASE, min(args.pantry_size, len(BASE)) * 2 // 3)
+        pantry += rng.sample(vocabulary[len(BASE):], args.pantry_size - len(pantry))
+        start = time.perf_counter()
+        index.match(pantry, k=args.top_k)
+        latencies.append(time.perf_counter() - start)
+
+    print(f"index: {len(index)} recipes, {len(index.vocab)} ingredients, built in {built:.2f} s")
+    print(
+        f"match (pantry of {args.pantry_size}, top {args.top_k}): "
+        f"p50 {percentile(latencies, 50) * 1000:.1f} ms, p99 {percentile(latencies, 99) * 1000:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
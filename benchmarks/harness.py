@@ -0,0 +1,70 @@
+"""Helpers shared by the benchmark scripts: background uvicorn servers, tokens, percentiles."""
+import os
+import socket
+import threading
+import time
+
+import jwt
+import uvicorn
+
+BENCH_JWT_SECRET = "bench-jwt-secret-with-enough-length-for-hs256"
+BENCH_METRICS_TOKEN = "bench-metrics-token"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class BackgroundServer:
+    """Run an ASGI app under uvicorn in a daemon thread."""
+
+    def __init__(self, app, port=None, **config):
+        self.port = port or free_port()
+        config.setdefault("log_level", "warning")
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port, **config))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        self.thread.start()
+        deadline = time.monotonic() + 10
+        while not self.server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("server did not start")
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+def configure_app_env(stub_url):
+    """Point main.py at the stubs. Must run before `import main`."""
+    os.environ["SUPABASE_URL"] = stub_url
+    os.environ["SUPABASE_KEY"] = "bench-service-key"
+    os.environ["SUPABASE_JWT_SECRET"] = BENCH_JWT_SECRET
+    os.environ["OPENROUTER_API_KEY"] = "bench-openrouter-key"
+    os.environ["OPENROUTER_BASE_URL"] = f"{stub_url}/v1"
+    os.environ["METRICS_TOKEN"] = BENCH_METRICS_TOKEN
+    # One bench user drives all the load; don't let the per-user/global LLM caps shape it.
+    os.environ.setdefault("LLM_MAX_CONCURRENCY", "1000")
+    os.environ.setdefault("LLM_MAX_CONCURRENCY_PER_USER", "1000")
+
+
+def bench_token(user_id="bench-user"):
+    claims = {"sub": user_id, "aud": "authenticated", "exp": int(time.time()) + 3600}
+    return jwt.encode(claims, BENCH_JWT_SECRET, algorithm="HS256")
+
+
+def percentile(samples, pct):
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
@@ -0,0 +1,139 @@
+"""
+Local stand-ins for Supabase (PostgREST + auth) and OpenRouter, used by the
+benchmarks so the app can be load-tested without touching real services.
+
+    python -m benchmarks.stubs --port 9000 --db-latency 0.01 --llm-latency 2
+
+Point the app at it with SUPABASE_URL=http://127.0.0.1:9000 and
+OPENROUTER_BASE_URL=http://127.0.0.1:9000/v1.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+RECIPE_TEXT = (
+    "### Recipe: Stub Omelette\n\n**Ingredients**\n- 2 eggs\n\n**Steps**\n1. Whisk.\n2. Cook.\n\n"
+    "### Recipe: Stub Salad\n\n**Ingredients**\n- 1 head lettuce\n\n**Steps**\n1. Chop.\n2. Toss.\n"
+)
+
+
+def _coerce(value):
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+def _matches(row, column, expr):
+    op, _, raw = expr.partition(".")
+    value = row.get(column)
+    if op == "eq":
+        return value == _coerce(raw)
+    if op == "in":
+        return value in {_coerce(v) for v in raw.strip("()").split(",") if v}
+    return True
+
+
+class StubState:
+    def __init__(self, db_latency=0.0, llm_latency=0.0):
+        self.db_latency = db_latency
+        self.llm_latency = llm_latency
+        self.rows = []
+        self.ids = itertools.count(1)
+        self.calls = {"db": 0, "llm": 0}
+
+    def seed(self, user_id, items):
+        for item in items:
+            self.rows.append({"id": next(self.ids), "user_id": user_id, "unit": "", **item})
+
+
+def create_stub_app(state=None):
+    state = state or StubState()
+
+    def filtered(request):
+        filters = [(k, v) for k, v in request.query_params.multi_items() if k not in ("select", "order", "limit")]
+        return [row for row in state.rows if all(_matches(row, k, v) for k, v in filters)]
+
+    async def pantry(request: Request):
+        state.calls["db"] += 1
+        await asyncio.sleep(state.db_latency)
+        if request.method == "GET":
+            rows = filtered(request)
+            order = request.query_params.get("order")
+            if order:
+                column, _, direction = order.partition(".")
+                rows = sorted(rows, key=lambda r: r.get(column), reverse=direction.startswith("desc"))
+            limit = request.query_params.get("limit")
+            if limit:
+                rows = rows[:int(limit)]
+            return JSONResponse(rows)
+        if request.method == "POST":
+            body = await request.json()
+            created = []
+            for data in body if isinstance(body, list) else [body]:
+                row = {"id": next(state.ids), **data}
+                state.rows.append(row)
+                created.append(row)
+            return JSONResponse(created, status_code=201)
+        if request.method == "PATCH":
+            changes = await request.json()
+            rows = filtered(request)
+            for row in rows:
+                row.update(changes)
+            return JSONResponse(rows)
+        if request.method == "DELETE":
+            rows = filtered(request)
+            state.rows = [row for row in state.rows if row not in rows]
+            return JSONResponse(rows)
+
+    async def auth_user(request: Request):
+        await asyncio.sleep(state.db_latency)
+        return JSONResponse({"id": "bench-user", "aud": "authenticated", "app_metadata": {},
+                             "user_metadata": {}, "created_at": "2024-01-01T00:00:00Z"})
+
+    async def models(request: Request):
+        return JSONResponse({"data": []})
+
+    async def chat_completions(request: Request):
+        state.calls["llm"] += 1
+        body = await request.json()
+        if body.get("stream"):
+            words = RECIPE_TEXT.split(" ")
+
+            async def events():
+                # Spread the configured latency over the tokens, like a real generation.
+                for word in words:
+                    await asyncio.sleep(state.llm_latency / len(words))
+                    chunk = {"choices": [{"delta": {"content": word + " "}}]}
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+        await asyncio.sleep(state.llm_latency)
+        return JSONResponse({"choices": [{"message": {"role": "assistant", "content": RECIPE_TEXT}}]})
+
+    app = Starlette(routes=[
+        Route("/rest/v1/pantry", pantry, methods=["GET", "POST", "PATCH", "DELETE"]),
+        Route("/auth/v1/user", auth_user),
+        Route("/v1/models", models),
+        Route("/v1/chat/completions", chat_completions, methods=["POST"]),
+    ])
+    app.state.stub = state
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--db-latency", type=float, default=0.01)
+    parser.add_argument("--llm-latency", type=float, default=2.0)
+    args = parser.parse_args()
+    uvicorn.run(create_stub_app(StubState(args.db_latency, args.llm_latency)), port=args.port, log_level="warning")
@@ -0,0 +1,261 @@
+import os
+import re
+import time
+from types import SimpleNamespace
+
+import httpx
+import jwt
+import pytest
+
+# main.py reads its config at import time; keep the suite offline.
+TEST_JWT_SECRET = "test-jwt-secret-with-enough-length-for-hs256"
+os.environ.setdefault("SUPABASE_URL", "http://supabase.test")
+os.environ.setdefault("SUPABASE_KEY", "test-service-key")
+os.environ.setdefault("OPENROUTER_API_KEY", "test-openrouter-key")
+os.environ.setdefault("OPENROUTER_BASE_URL", "http://openrouter.test/api/v1")
+os.environ["SUPABASE_JWT_SECRET"] = TEST_JWT_SECRET
+TEST_METRICS_TOKEN = "test-metrics-token"
+os.environ["METRICS_TOKEN"] = TEST_METRICS_TOKEN
+
+
+def collate(value):
+    # Text compares like a case-insensitive database collation, not by code point.
+    return (value.casefold(), value) if isinstance(value, str) else value
+
+
+COMPARATORS = {
+    "eq": lambda a, b: a == b,
+    # Comparisons with NULL are never true.
+    "gt": lambda a, b: a is not None and collate(a) > collate(b),
+    "gte": lambda a, b: a is not None and collate(a) >= collate(b),
+    "lt": lambda a, b: a is not None and collate(a) < collate(b),
+    "lte": lambda a, b: a is not None and collate(a) <= collate(b),
+    "is": lambda a, b: a is None if b == "null" else a is b,
+}
+
+
+def postgres_order(value):
+    # NULLs sort after every value, as in Postgres (so first when descending).
+    return (value is None, collate(value))
+
+
+def ilike_regex(pattern):
+    """ILIKE semantics, with PostgREST's * for %: % any run, _ any one character, backslash escapes."""
+    wildcards = {"*": ".*", "%": ".*", "_": "."}
+    parts = re.findall(r"\\.?|.", pattern, re.DOTALL)
+    regex = "".join(re.escape(part[-1]) if part.startswith("\\") else wildcards.get(part, re.escape(part)) for part in parts)
+    return re.compile(regex, re.IGNORECASE | re.DOTALL)
+
+
+def parse_or_filter(expr):
+    """Parse the subset of PostgREST or=(...) syntax the app emits, e.g. 'a.gt.1,and(a.eq.1,id.gt.2),a.is.null'."""
+    tokens = re.findall(r'and\(|\)|,|"(?:\\.|[^"\\])*"|[^,()"]+', expr)
+    pos = 0
+
+    def term():
+        nonlocal pos
+        if tokens[pos] == "and(":
+            pos += 1
+            parts = terms()
+            pos += 1  # ")"
+            return lambda row: all(part(row) for part in parts)
+        column, op, raw = tokens[pos].split(".", 2)
+        negate = op == "not"
+        if negate:
+            op, raw = raw.split(".", 1)
+        pos += 1
+        if raw == "" and pos < len(tokens) and tokens[pos].startswith('"'):
+            raw = re.sub(r"\\(.)", r"\1", tokens[pos][1:-1])
+            pos += 1
+        else:
+            raw = int(raw) if raw.lstrip("-").isdigit() else raw
+        return lambda row: COMPARATORS[op](row.get(column), raw) != negate
+
+    def terms():
+        nonlocal pos
+        parts = [term()]
+        while pos < len(tokens) and tokens[pos] == ",":
+            pos += 1
+            parts.append(term())
+        return parts
+
+    parts = terms()
+    return lambda row: any(part(row) for part in parts)
+
+
+class FakeQuery:
+    """Just enough of postgrest's async request builder for the routes under test."""
+
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.action = "select"
+        self.payload = None
+        self.filters = []
+        self.ordering = []
+        self.row_limit = None
+        self.columns = None
+
+    def select(self, *columns, **kwargs):
+        self.action = "select"
+        if columns and columns != ("*",):
+            self.columns = [c.strip() for column in columns for c in column.split(",")]
+        return self
+
+    def insert(self, data, **kwargs):
+        self.action, self.payload = "insert", data
+        return self
+
+    def update(self, data, **kwargs):
+        self.action, self.payload = "update", data
+        return self
+
+    def delete(self, **kwargs):
+        self.action = "delete"
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def filter(self, column, operator, value):
+        self.filters.append(lambda row: COMPARATORS[operator](row.get(column), value))
+        return self
+
+    def gte(self, column, value):
+        return self.filter(column, "gte", value)
+
+    def lte(self, column, value):
+        return self.filter(column, "lte", value)
+
+    def ilike(self, column, pattern):
+        regex = ilike_regex(pattern)
+        self.filters.append(lambda row: regex.fullmatch(str(row.get(column, ""))) is not None)
+        return self
+
+    def or_(self, filters):
+        self.filters.append(parse_or_filter(filters))
+        return self
+
+    def in_(self, column, values):
+        values = list(values)
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def order(self, column, desc=False, **kwargs):
+        self.ordering.append((column, desc))
+        return self
+
+    def limit(self, size, **kwargs):
+        self.row_limit = size
+        return self
+
+    def _matching(self):
+        return [row for row in self.db.tables[self.table] if all(f(row) for f in self.filters)]
+
+    async def execute(self):
+        self.db.queries.append((self.table, self.action))
+        rows = self.db.tables.setdefault(self.table, [])
+        if self.action == "insert":
+            created = []
+            for data in self.payload if isinstance(self.payload, list) else [self.payload]:
+                row = {"id": self.db.next_id(), **data}
+                rows.append(row)
+                created.append(dict(row))
+            return SimpleNamespace(data=created)
+        matching = self._matching()
+        if self.action == "update":
+            for row in matching:
+                row.update(self.payload)
+        elif self.action == "delete":
+            self.db.tables[self.table] = [row for row in rows if row not in matching]
+        for column, desc in reversed(self.ordering):
+            matching.sort(key=lambda row: postgres_order(row.get(column)), reverse=desc)
+        if self.row_limit is not None:
+            matching = matching[:self.row_limit]
+        if self.columns is not None:
+            return SimpleNamespace(data=[{c: row.get(c) for c in self.columns} for row in matching])
+        return SimpleNamespace(data=[dict(row) for row in matching])
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.tables = {"pantry": []}
+        self.queries = []
+        self._ids = 0
+
+    def next_id(self):
+        self._ids += 1
+        return self._ids
+
+    def table(self, name):
+        self.tables.setdefault(name, [])
+        return FakeQuery(self, name)
+
+    def seed(self, user_id, *items):
+        rows = []
+        for item in items:
+            row = {"id": self.next_id(), "user_id": user_id, "unit": "", **item}
+            self.tables["pantry"].append(row)
+            rows.append(row)
+        return rows
+
+
+def make_token(user_id="user-1", **claims):
+    payload = {"sub": user_id, "aud": "authenticated", "exp": int(time.time()) + 3600, **claims}
+    return jwt.encode(payload, TEST_JWT_SECRET, algorithm="HS256")
+
+
+def chat_completion(content):
+    return {"choices": [{"message": {"role": "assistant", "content": content}}]}
+
+
+@pytest.fixture
+def app_module():
+    import main
+    return main
+
+
+@pytest.fixture
+def db(app_module, monkeypatch):
+    fake = FakeSupabase()
+    monkeypatch.setattr(app_module, "supabase", fake)
+    return fake
+
+
+async def instant(delay):
+    pass
+
+
+@pytest.fixture
+def llm(app_module, monkeypatch):
+    """Route OpenRouter calls to a handler; tests set llm.handler and inspect llm.requests."""
+    state = SimpleNamespace(requests=[], handler=lambda request: httpx.Response(200, json=chat_completion("")))
+
+    def dispatch(request):
+        state.requests.append(request)
+        return state.handler(request)
+
+    client = httpx.AsyncClient(base_url=app_module.OPENROUTER_BASE_URL, transport=httpx.MockTransport(dispatch))
+    monkeypatch.setattr(app_module, "http_client", client)
+    # Fresh breaker/limiter per test; retries back off instantly.
+    monkeypatch.setattr(app_module, "llm_client", app_module.make_llm_client(client, sleep=instant))
+    return state
+
+
+@pytest.fixture
+def client(app_module, db, llm, monkeypatch):
+    from fastapi.testclient import TestClient
+    monkeypatch.setattr(app_module, "recipe_cache", app_module.make_recipe_cache())
+    monkeypatch.setattr(app_module, "pantry_cache", app_module.make_pantry_cache())
+    return TestClient(app_module.app)
+
+
+@pytest.fixture
+def auth_headers():
+    return {"Authorization": f"Bearer {make_token()}"}
+
+
+@pytest.fixture
+def metrics_headers():
+    return {"Authorization": f"Bearer {TEST_METRICS_TOKEN}"}
@@ -0,0 +1,270 @@
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import httpx
+
+
+class LLMError(Exception):
+    """
+    A generation that failed for good; status_code is what the API should answer
+    with, and the message is complete enough to show to the client as is.
+    """
+
+    status_code = 502
+
+    def __init__(self, detail, retry_after=None):
+        super().__init__(detail)
+        self.retry_after = retry_after
+
+
+class UpstreamError(LLMError):
+    """The provider answered with an error, or the connection to it failed."""
+
+    def __init__(self, detail, status=None, retry_after=None):
+        super().__init__(detail, retry_after)
+        self.status = status
+
+
+class UpstreamTimeout(LLMError):
+    status_code = 504
+
+
+class RateLimited(UpstreamError):
+    """Still 429 after the retries (or asked to wait longer than we're willing to)."""
+
+    status_code = 503
+
+
+class CircuitOpen(LLMError):
+    """The provider kept failing recently; calls fail fast until the breaker half-opens."""
+
+    status_code = 503
+
+
+class Overloaded(LLMError):
+    """No generation slot free: 429 when it's the user's own cap, 503 for the process-wide one."""
+
+    def __init__(self, detail, status_code=503):
+        super().__init__(detail, retry_after=1)
+        self.status_code = status_code
+
+
+def parse_retry_after(value, now=None):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date), or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    now = now or datetime.now(timezone.utc)
+    return max(0.0, (when - now).total_seconds())
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures and rejects calls for
+    reset_timeout seconds. After that one probe call is let through (which
+    re-arms the timer for everyone else); its outcome closes or re-opens it.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    def check(self):
+        if self.state == "open":
+            remaining = self.reset_timeout - (self.clock() - self.opened_at)
+            raise CircuitOpen("AI provider unavailable, try again shortly", retry_after=max(1, round(remaining)))
+
+    def before_attempt(self):
+        self.check()
+        if self.state == "half_open":
+            self.opened_at = self.clock()
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = self.clock()
+
+
+class ConcurrencyLimiter:
+    """
+    Caps in-flight generations per process and per user. A user over their cap
+    is rejected at once; otherwise callers queue up to queue_timeout for a
+    process-wide slot.
+    """
+
+    def __init__(self, max_concurrency=32, per_user=2, queue_timeout=5.0):
+        self.max_concurrency = max_concurrency
+        self.per_user = per_user
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._users = {}
+
+    @asynccontextmanager
+    async def slot(self, user_id=None):
+        if user_id is not None:
+            if self._users.get(user_id, 0) >= self.per_user:
+                raise Overloaded("Too many recipe generations in progress", status_code=429)
+            self._users[user_id] = self._users.get(user_id, 0) + 1
+        try:
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                raise Overloaded("AI generation capacity exhausted, try again shortly") from None
+            self.in_flight += 1
+            try:
+                yield
+            finally:
+                self.in_flight -= 1
+                self._slots.release()
+        finally:
+            if user_id is not None:
+                self._users[user_id] -= 1
+                if not self._users[user_id]:
+                    del self._users[user_id]
+
+
+class LLMClient:
+    """
+    Chat-completions client for OpenRouter-style APIs. Each call gets a slot
+    from the limiter, then up to max_retries retries on 429, 5xx and transport
+    errors, with full-jitter exponential backoff or the server's Retry-After.
+    `http` is an httpx.AsyncClient whose base_url points at the API.
+    """
+
+    def __init__(
+        self,
+        http=None,
+        timeout=httpx.Timeout(60, connect=5),
+        max_retries=2,
+        backoff_base=0.5,
+        backoff_max=8.0,
+        retry_after_max=10.0,
+        breaker=None,
+        limiter=None,
+        sleep=asyncio.sleep,
+        jitter=random.random,
+    ):
+        self.http = http
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_after_max = retry_after_max
+        self.breaker = breaker or CircuitBreaker()
+        self.limiter = limiter or ConcurrencyLimiter()
+        self.sleep = sleep
+        self.jitter = jitter
+
+    def backoff(self, attempt):
+        return self.jitter() * min(self.backoff_max, self.backoff_base * 2 ** attempt)
+
+    async def _send(self, body, stream):
+        """The first 2xx response, after retries; the caller closes it."""
+        for attempt in range(self.max_retries + 1):
+            self.breaker.before_attempt()
+            request = self.http.build_request("POST", "/chat/completions", json=body, timeout=self.timeout)
+            try:
+                response = await self.http.send(request, stream=stream)
+            except httpx.TimeoutException as exc:
+                self.breaker.record_failure()
+                error = UpstreamTimeout(f"AI request timed out ({type(exc).__name__})")
+            except httpx.TransportError as exc:
+                self.breaker.record_failure()
+                error = UpstreamError(f"AI request failed: {exc!r}")
+            else:
+                if response.is_success:
+                    self.breaker.record_success()
+                    return response
+                detail = (await response.aread()).decode(errors="replace")
+                await response.aclose()
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                message = f"AI provider returned HTTP {response.status_code}: {detail}"
+                if response.status_code == 429:
+                    # Throttled, but up: not a breaker failure.
+                    self.breaker.record_success()
+                    error = RateLimited(message, status=429, retry_after=retry_after)
+                elif response.status_code >= 500:
+                    self.breaker.record_failure()
+                    error = UpstreamError(message, status=response.status_code, retry_after=retry_after)
+                else:
+                    # Our request is wrong; retrying won't help.
+                    self.breaker.record_success()
+                    raise UpstreamError(message, status=response.status_code)
+
+            if attempt == self.max_retries:
+                raise error
+            if error.retry_after is not None:
+                if error.retry_after > self.retry_after_max:
+                    raise error
+                delay = error.retry_after
+            else:
+                delay = self.backoff(attempt)
+            await self.sleep(delay)
+
+    async def complete(self, body, user_id=None):
+        """POST /chat/completions and return the decoded JSON body."""
+        self.breaker.check()
+        async with self.limiter.slot(user_id):
+            response = await self._send(body, stream=False)
+        try:
+            return response.json()
+        except ValueError:
+            raise UpstreamError("AI response was not JSON", status=response.status_code) from None
+
+    @asynccontextmanager
+    async def stream(self, body, user_id=None):
+        """
+        Streaming POST /chat/completions; yields the open 2xx response. Retries
+        only happen before the response starts, and the slot is held until the
+        stream is closed.
+        """
+        self.breaker.check()
+        async with self.limiter.slot(user_id):
+            response = await self._send(body, stream=True)
+            try:
+                yield response
+            except httpx.TimeoutException as exc:
+                self.breaker.record_failure()
+                raise UpstreamTimeout(f"AI stream stalled ({type(exc).__name__})") from exc
+            except httpx.TransportError as exc:
+                self.breaker.record_failure()
+                raise UpstreamError(f"AI stream failed: {exc!r}") from exc
+            finally:
+                await response.aclose()
+
+    def snapshot(self):
+        return {
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "in_flight": self.limiter.in_flight,
+            "max_concurrency": self.limiter.max_concurrency,
+        }
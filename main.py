@@ -1,22 +1,26 @@
-from fastapi import FastAPI, Depends, HTTPException, Header
-from pydantic import BaseModel
-from supabase import create_client, Client
-import requests
+from fastapi import FastAPI, Depends, HTTPException, Header, Query, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from supabase import acreate_client, AsyncClient, AsyncClientOptions, AuthRetryableError, PostgrestAPIError
+from contextlib import asynccontextmanager
+from typing import Annotated, Literal
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import httpx
 import os
+import re
 from fastapi.middleware.cors import CORSMiddleware
 
-# 🔹 FastAPI app
-app = FastAPI()
-
-# 🔹 CORS Middleware (restrict to Netlify frontend)
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["https://smartmealplanning.netlify.app/pantry", "https://smartmealplanning.netlify.app/add",
-                  "https://smartmealplanning.netlify.app"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+from auth import AuthUnavailable, InvalidToken, JWKSCache, TokenCache, TokenVerifier
+from llm import CircuitBreaker, ConcurrencyLimiter, LLMClient, LLMError
+from metrics import REGISTRY, MetricsMiddleware, span
+from pantry_cache import MemoryPantryBackend, PantryCache, RedisPantryBackend
+from recipe_engine import RecipeIndex, format_recipes, load_recipes
+from recipe_cache import MemoryBackend, RecipeCache, SQLiteBackend, pantry_fingerprint
+from recipe_stream import RecipeSplitter, iter_sse_deltas, sse_event
 
 # 🔹 Supabase config
 SUPABASE_URL = os.getenv("SUPABASE_URL")
@@ -24,19 +28,123 @@ SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 if not SUPABASE_URL or not SUPABASE_KEY:
     raise RuntimeError("Missing SUPABASE_URL or SUPABASE_KEY environment variables.")
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# 🔹 Auth config (tokens are verified locally; remote get_user is opt-in)
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+SUPABASE_JWKS_URL = os.getenv("SUPABASE_JWKS_URL", f"{SUPABASE_URL.rstrip('/')}/auth/v1/.well-known/jwks.json")
+SUPABASE_JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+AUTH_REMOTE_FALLBACK = os.getenv("AUTH_REMOTE_FALLBACK", "false").lower() in ("1", "true", "yes")
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "1024"))
+AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", "300"))
+AUTH_NEGATIVE_CACHE_TTL = int(os.getenv("AUTH_NEGATIVE_CACHE_TTL", "30"))
+
+# 🔹 Ops endpoints (/metrics, /api/recipes/cache): disabled unless METRICS_TOKEN is set
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
 
 # 🔹 AI API key
 AI_API_KEY = os.getenv("OPENROUTER_API_KEY")
 if not AI_API_KEY:
     raise RuntimeError("Missing OPENROUTER_API_KEY environment variable.")
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+
+# 🔹 LLM client config (timeouts, retries on 429/5xx, circuit breaker, concurrency caps)
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "8"))
+LLM_RETRY_AFTER_MAX = float(os.getenv("LLM_RETRY_AFTER_MAX", "10"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_MAX_CONCURRENCY_PER_USER = int(os.getenv("LLM_MAX_CONCURRENCY_PER_USER", "2"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "5"))
+
+# 🔹 Recipe cache config (RECIPE_CACHE_BACKEND: memory | sqlite | none)
+RECIPE_CACHE_BACKEND = os.getenv("RECIPE_CACHE_BACKEND", "memory").lower()
+RECIPE_CACHE_TTL = int(os.getenv("RECIPE_CACHE_TTL", "3600"))
+RECIPE_CACHE_SIZE = int(os.getenv("RECIPE_CACHE_SIZE", "512"))
+RECIPE_CACHE_PATH = os.getenv("RECIPE_CACHE_PATH", "recipe_cache.sqlite3")
+
+# 🔹 Local recipe engine config (used by /api/recipes?engine=local|auto)
+RECIPE_CORPUS_PATH = os.getenv("RECIPE_CORPUS_PATH", os.path.join(os.path.dirname(__file__), "data", "recipes.json"))
+RECIPE_LOCAL_TOP_K = int(os.getenv("RECIPE_LOCAL_TOP_K", "2"))
+RECIPE_AUTO_MIN_COVERAGE = float(os.getenv("RECIPE_AUTO_MIN_COVERAGE", "0.8"))
+RECIPE_AUTO_LLM_TIMEOUT = float(os.getenv("RECIPE_AUTO_LLM_TIMEOUT", "20"))
+
+# 🔹 Pantry cache config (PANTRY_CACHE_BACKEND: memory | redis | none)
+PANTRY_CACHE_BACKEND = os.getenv("PANTRY_CACHE_BACKEND", "memory").lower()
+PANTRY_CACHE_TTL = int(os.getenv("PANTRY_CACHE_TTL", "300"))
+PANTRY_CACHE_MAX_USERS = int(os.getenv("PANTRY_CACHE_MAX_USERS", "1024"))
+PANTRY_CACHE_REDIS_URL = os.getenv("PANTRY_CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+# 🔹 Outbound HTTP pools (shared keep-alive connections, bounded per process)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_LIMITS = httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_KEEPALIVE)
+
+# Created in lifespan(); module-level so routes and tests can reach them.
+supabase: AsyncClient = None
+http_client: httpx.AsyncClient = None
+
+
+async def probe_openrouter():
+    # 🔹 Test AI API key (in the background so startup never blocks on it)
+    try:
+        response = await http_client.get("/models", timeout=10)
+        print("OpenRouter test:", response.status_code)
+    except httpx.HTTPError as exc:
+        print("OpenRouter test failed:", exc)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global supabase, http_client
+    supabase_http = httpx.AsyncClient(limits=HTTP_LIMITS, timeout=30, follow_redirects=True)
+    supabase = await acreate_client(SUPABASE_URL, SUPABASE_KEY, options=AsyncClientOptions(httpx_client=supabase_http))
+    http_client = httpx.AsyncClient(
+        base_url=OPENROUTER_BASE_URL,
+        headers={"Authorization": f"Bearer {AI_API_KEY}"},
+        limits=HTTP_LIMITS,
+        timeout=httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+    )
+    llm_client.http = http_client
+    # SUPABASE_JWKS_URL comes from env: fetch it with a client that carries no credentials.
+    jwks_http = httpx.AsyncClient(limits=HTTP_LIMITS, timeout=10)
+    token_verifier.jwks.http = jwks_http
+    for warning in token_verifier.warnings():
+        print("Auth config warning:", warning, "Set SUPABASE_JWT_SECRET or AUTH_REMOTE_FALLBACK=true.")
+    probe = asyncio.create_task(probe_openrouter())
+    try:
+        await asyncio.to_thread(get_recipe_index)
+    except (OSError, ValueError) as exc:
+        print("Recipe corpus not loaded:", exc)
+    try:
+        yield
+    finally:
+        probe.cancel()
+        token_verifier.jwks.http = None
+        llm_client.http = None
+        await http_client.aclose()
+        await jwks_http.aclose()
+        await supabase_http.aclose()
+
+
+# 🔹 FastAPI app
+app = FastAPI(lifespan=lifespan)
 
-# 🔹 Test AI API key
-response = requests.get(
-    "https://openrouter.ai/api/v1/models",
-    headers={"Authorization": f"Bearer {AI_API_KEY}"}
+# 🔹 CORS Middleware (restrict to Netlify frontend)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["https://smartmealplanning.netlify.app/pantry", "https://smartmealplanning.netlify.app/add",
+                  "https://smartmealplanning.netlify.app"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "Server-Timing"],
 )
-print("OpenRouter test:", response.status_code)
+
+# 🔹 Metrics (request histograms per route + Server-Timing; spans via metrics.span)
+app.add_middleware(MetricsMiddleware)
 
 # 🔹 Models
 class PantryItem(BaseModel):
@@ -47,8 +155,49 @@ class PantryItem(BaseModel):
 class PantryUpdate(BaseModel):
     quantity: int
 
+class PantryBatchUpdate(BaseModel):
+    id: int
+    quantity: int
+
+MAX_BATCH_SIZE = 500
+
+# Distinct quantities in a batch update run as separate statements, at most this many at once.
+BATCH_UPDATE_CONCURRENCY = int(os.getenv("BATCH_UPDATE_CONCURRENCY", "4"))
+
+def check_batch_size(batch: list):
+    if not batch:
+        raise HTTPException(status_code=422, detail="Batch is empty")
+    if len(batch) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=422, detail=f"Batch exceeds {MAX_BATCH_SIZE} items")
+
+# 🔹 Supabase queries (each one timed as a supabase.<action> span)
+async def run_query(query, action: str):
+    with span(f"supabase.{action}"):
+        return await query.execute()
+
 # 🔹 Auth helper (fixed for supabase-py v2)
-def get_current_user_id(authorization: str = Header(...)):
+async def remote_user_lookup(token: str):
+    try:
+        with span("supabase.auth"):
+            user_resp = await supabase.auth.get_user(token)
+    except (AuthRetryableError, httpx.HTTPError) as exc:
+        raise AuthUnavailable(f"Auth lookup failed: {exc}")
+    except Exception:
+        raise InvalidToken("Invalid token")
+    if not user_resp or not user_resp.user:
+        return None
+    return user_resp.user.id
+
+token_verifier = TokenVerifier(
+    secret=SUPABASE_JWT_SECRET,
+    jwks=JWKSCache(SUPABASE_JWKS_URL),
+    audience=SUPABASE_JWT_AUDIENCE,
+    cache=TokenCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL),
+    remote_lookup=remote_user_lookup if AUTH_REMOTE_FALLBACK else None,
+    negative_ttl=AUTH_NEGATIVE_CACHE_TTL,
+)
+
+async def get_current_user_id(authorization: str = Header(...)):
     """
     Extract user ID from Supabase JWT sent in Authorization header.
     Frontend should send: "Authorization: Bearer <access_token>"
@@ -58,70 +207,372 @@ def get_current_user_id(authorization: str = Header(...)):
     token = authorization.split(" ")[1]
 
     try:
-        user_resp = supabase.auth.get_user(token)
-    except Exception:
+        with span("auth"):
+            return await token_verifier.verify(token)
+    except AuthUnavailable:
+        # Signing keys or the auth server are unreachable: the token may well be
+        # fine, so don't answer 401 and have the frontend sign the user out.
+        raise HTTPException(status_code=503, detail="Authentication temporarily unavailable", headers={"Retry-After": "5"})
+    except InvalidToken:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    if not user_resp or not user_resp.user:
-        raise HTTPException(status_code=401, detail="Invalid token or user not found")
+async def require_metrics_token(authorization: str | None = Header(None)):
+    """
+    Guard for the ops endpoints: "Authorization: Bearer <METRICS_TOKEN>".
+    Without METRICS_TOKEN configured they don't exist.
+    """
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    token = authorization.removeprefix("Bearer ") if authorization else ""
+    if not hmac.compare_digest(token.encode(), METRICS_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+
+# 🔹 Recipe cache
+def make_recipe_cache():
+    if RECIPE_CACHE_BACKEND == "sqlite":
+        return RecipeCache(SQLiteBackend(RECIPE_CACHE_PATH, maxsize=RECIPE_CACHE_SIZE, ttl=RECIPE_CACHE_TTL))
+    if RECIPE_CACHE_BACKEND == "none":
+        return RecipeCache(MemoryBackend(maxsize=0))
+    return RecipeCache(MemoryBackend(maxsize=RECIPE_CACHE_SIZE, ttl=RECIPE_CACHE_TTL))
+
+recipe_cache = make_recipe_cache()
+
+# 🔹 Pantry cache (read-through on reads, write-through from the write routes)
+def make_pantry_cache():
+    if PANTRY_CACHE_BACKEND == "none":
+        return None
+    if PANTRY_CACHE_BACKEND == "redis":
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("PANTRY_CACHE_BACKEND=redis requires the 'redis' package.")
+        client = redis.from_url(PANTRY_CACHE_REDIS_URL, decode_responses=True)
+        return PantryCache(RedisPantryBackend(client, ttl=PANTRY_CACHE_TTL))
+    return PantryCache(MemoryPantryBackend(max_users=PANTRY_CACHE_MAX_USERS, ttl=PANTRY_CACHE_TTL))
 
-    return user_resp.user.id
+pantry_cache = make_pantry_cache()
+
+async def fetch_pantry_rows(user_id: str):
+    response = await run_query(supabase.table("pantry").select("*").eq("user_id", user_id), "select")
+    if response.data is None:
+        raise HTTPException(status_code=400, detail="Failed to fetch pantry items")
+    return response.data
+
+async def load_pantry_rows(user_id: str):
+    if pantry_cache is None:
+        return await fetch_pantry_rows(user_id)
+    return await pantry_cache.rows(user_id, fetch_pantry_rows)
+
+# 🔹 Local recipe engine (corpus loaded once, on startup or first use)
+recipe_index: RecipeIndex = None
+
+def get_recipe_index():
+    global recipe_index
+    if recipe_index is None:
+        recipe_index = RecipeIndex(load_recipes(RECIPE_CORPUS_PATH))
+    return recipe_index
+
+async def pantry_written(user_id: str, rows: list):
+    recipe_cache.invalidate(user_id)
+    if pantry_cache is not None:
+        await pantry_cache.written(user_id, rows)
+
+async def pantry_removed(user_id: str, item_ids: list):
+    recipe_cache.invalidate(user_id)
+    if pantry_cache is not None:
+        await pantry_cache.removed(user_id, item_ids)
+
+async def pantry_invalidated(user_id: str):
+    """For writes whose outcome is unknown: the next read reloads from Supabase."""
+    recipe_cache.invalidate(user_id)
+    if pantry_cache is not None:
+        await pantry_cache.invalidate(user_id)
 
 # 🔹 Routes
 
 @app.post("/pantry/add", status_code=201)
-def add_pantry_item(item: PantryItem, user_id: str = Depends(get_current_user_id)):
+async def add_pantry_item(item: PantryItem, user_id: str = Depends(get_current_user_id)):
     data = item.model_dump()
     data["user_id"] = user_id
-    response = supabase.table("pantry").insert(data).execute()
+    response = await run_query(supabase.table("pantry").insert(data), "insert")
     if not response.data:
         raise HTTPException(status_code=400, detail="Failed to insert pantry item")
+    await pantry_written(user_id, response.data)
     return response.data
 
 
-@app.get("/pantry/list")
-def list_pantry_items(user_id: str = Depends(get_current_user_id)):
-    response = supabase.table("pantry").select("*").eq("user_id", user_id).execute()
+PANTRY_COLUMNS = ("id", "item", "quantity", "unit")
+MAX_PAGE_SIZE = 500
+
+# Value types a cursor may carry per sort column; NULL is allowed except for id.
+CURSOR_TYPES = {"id": (int,), "item": (str, type(None)), "unit": (str, type(None)), "quantity": (int, type(None))}
+
+def encode_cursor(row: dict, sort: str, order: str):
+    raw = json.dumps([sort, order, row.get(sort), row["id"]], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort: str, order: str):
+    """(last value, last id) from a cursor issued for the same sort and order, else 400."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, cursor_order, last_value, last_id = json.loads(raw)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if (cursor_sort, cursor_order) != (sort, order):
+        raise HTTPException(status_code=400, detail="Cursor was issued for a different sort or order")
+    if (
+        not isinstance(last_id, int) or isinstance(last_id, bool)
+        or not isinstance(last_value, CURSOR_TYPES[sort]) or isinstance(last_value, bool)
+    ):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return last_value, last_id
+
+def postgrest_value(value):
+    # Quote strings so commas/parentheses can't break out of an or=(...) filter.
+    if isinstance(value, str):
+        return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+    return json.dumps(value)
+
+def pantry_etag(payload):
+    digest = hashlib.sha1(json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+def etag_matches(if_none_match: str | None, etag: str):
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # Weak comparison: W/"x" and "x" are the same validator.
+    return "*" in candidates or etag.removeprefix("W/") in [tag.removeprefix("W/") for tag in candidates]
+
+class PantryListQuery(BaseModel):
+    limit: int | None = Field(None, ge=1, le=MAX_PAGE_SIZE)
+    cursor: str | None = None
+    fields: str | None = None
+    item: str | None = None
+    unit: str | None = None
+    min_quantity: int | None = None
+    max_quantity: int | None = None
+    sort: Literal["id", "item", "unit", "quantity"] = "id"
+    order: Literal["asc", "desc"] = "asc"
+
+async def query_pantry_page(user_id: str, params: PantryListQuery, select: str):
+    """One page (plus one look-ahead row) filtered, sorted and limited by PostgREST."""
+    desc = params.order == "desc"
+    query = supabase.table("pantry").select(select).eq("user_id", user_id)
+    if params.item:
+        query = query.ilike("item", f"*{params.item}*")
+    if params.unit is not None:
+        query = query.eq("unit", params.unit)
+    if params.min_quantity is not None:
+        query = query.gte("quantity", params.min_quantity)
+    if params.max_quantity is not None:
+        query = query.lte("quantity", params.max_quantity)
+    if params.cursor:
+        last_value, last_id = decode_cursor(params.cursor, params.sort, params.order)
+        op = "lt" if desc else "gt"
+        sort = params.sort
+        if sort == "id":
+            query = query.filter("id", op, last_id)
+        elif last_value is None:
+            # Postgres puts NULLs last ascending and first descending.
+            rest = f"{sort}.not.is.null," if desc else ""
+            query = query.or_(f"{rest}and({sort}.is.null,id.{op}.{last_id})")
+        else:
+            value = postgrest_value(last_value)
+            nulls = "" if desc else f",{sort}.is.null"
+            query = query.or_(f"{sort}.{op}.{value},and({sort}.eq.{value},id.{op}.{last_id}){nulls}")
+    if params.sort != "id":
+        query = query.order(params.sort, desc=desc)
+    query = query.order("id", desc=desc)
+    if params.limit is not None:
+        query = query.limit(params.limit + 1)
+
+    response = await run_query(query, "select")
     if response.data is None:
         raise HTTPException(status_code=400, detail="Failed to fetch pantry items")
     return response.data
 
-@app.patch("/pantry/update/{item_id}")
-def update_pantry_item(item_id: int, update: PantryUpdate, user_id: str = Depends(get_current_user_id)):
-    item_resp = supabase.table("pantry").select("*").eq("id", item_id).eq("user_id", user_id).execute()
-    if not item_resp.data:
-        raise HTTPException(status_code=404, detail="Item not found")
+def ilike_matcher(pattern: str):
+    """PostgREST ilike in Python: * and % match any run, _ one character, backslash escapes."""
+    regex = []
+    chars = iter(pattern)
+    for char in chars:
+        if char == "\\":
+            regex.append(re.escape(next(chars, char)))
+        elif char in "*%":
+            regex.append(".*")
+        elif char == "_":
+            regex.append(".")
+        else:
+            regex.append(re.escape(char))
+    return re.compile("".join(regex), re.IGNORECASE | re.DOTALL).fullmatch
+
+def page_pantry_rows(rows: list, params: PantryListQuery):
+    """
+    Same page as query_pantry_page, computed from the cached full pantry. Text
+    sorts case-insensitively (casefold, then the raw string) to approximate the
+    database collation; only rows differing in case alone may order differently.
+    """
+    item_matches = ilike_matcher(f"*{params.item}*") if params.item else None
+    selected = [
+        row for row in rows
+        if (item_matches is None or item_matches(str(row["item"])))
+        and (params.unit is None or row.get("unit") == params.unit)
+        and (params.min_quantity is None or (row["quantity"] is not None and row["quantity"] >= params.min_quantity))
+        and (params.max_quantity is None or (row["quantity"] is not None and row["quantity"] <= params.max_quantity))
+    ]
+    desc = params.order == "desc"
+
+    def sort_key(row):
+        # NULLs after every value, like Postgres, so they never get compared with one.
+        value = row.get(params.sort)
+        if isinstance(value, str):
+            value = (value.casefold(), value)
+        return (value is None, value, row["id"])
+
+    selected.sort(key=sort_key, reverse=desc)
+    if params.cursor:
+        last_value, last_id = decode_cursor(params.cursor, params.sort, params.order)
+        last = sort_key({params.sort: last_value, "id": last_id})
+        selected = [row for row in selected if (sort_key(row) < last if desc else sort_key(row) > last)]
+    if params.limit is not None:
+        selected = selected[:params.limit + 1]
+    return selected
 
-    updated_resp = supabase.table("pantry").update({"quantity": update.quantity}).eq("id", item_id).eq("user_id", user_id).execute()
+@app.get("/pantry/list")
+async def list_pantry_items(
+    params: Annotated[PantryListQuery, Query()],
+    if_none_match: str | None = Header(None),
+    user_id: str = Depends(get_current_user_id),
+):
+    """
+    List the user's pantry. Without parameters this returns every item, as before.
+    Pages are keyset-paginated on (sort, id); the next page's cursor is sent in
+    the X-Next-Cursor header. Responses carry a weak ETag and honour If-None-Match.
+    With the pantry cache enabled the page is cut from the cached pantry;
+    otherwise filtering, sorting and paging run in PostgREST.
+    """
+    columns = None
+    if params.fields:
+        columns = [column.strip() for column in params.fields.split(",") if column.strip()]
+        unknown = set(columns) - set(PANTRY_COLUMNS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    if pantry_cache is not None:
+        rows = page_pantry_rows(await load_pantry_rows(user_id), params)
+    else:
+        # id and the sort column are needed to build the cursor; they're trimmed off below.
+        select = ",".join(dict.fromkeys([*columns, "id", params.sort])) if columns else "*"
+        rows = await query_pantry_page(user_id, params, select)
+
+    next_cursor = None
+    if params.limit is not None and len(rows) > params.limit:
+        rows = rows[:params.limit]
+        next_cursor = encode_cursor(rows[-1], params.sort, params.order)
+    if columns is not None:
+        rows = [{column: row.get(column) for column in columns} for row in rows]
+
+    headers = {"ETag": pantry_etag([rows, next_cursor]), "Cache-Control": "private, no-cache"}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(rows, headers=headers)
+
+# Update and delete are single conditional statements: the rows PostgREST
+# returns tell us whether (id, user_id) matched, so no pre-SELECT is needed.
+@app.patch("/pantry/update/{item_id}")
+async def update_pantry_item(item_id: int, update: PantryUpdate, user_id: str = Depends(get_current_user_id)):
+    updated_resp = await run_query(supabase.table("pantry").update({"quantity": update.quantity}).eq("id", item_id).eq("user_id", user_id), "update")
     if not updated_resp.data:
-        raise HTTPException(status_code=400, detail="Failed to update pantry item")
+        raise HTTPException(status_code=404, detail="Item not found")
+    await pantry_written(user_id, updated_resp.data)
     return {"detail": "Item updated successfully", "item": updated_resp.data[0]}
 
 @app.delete("/pantry/remove/{item_id}")
-def remove_pantry_item(item_id: int, user_id: str = Depends(get_current_user_id)):
-    item_resp = supabase.table("pantry").select("*").eq("id", item_id).eq("user_id", user_id).execute()
-    if not item_resp.data:
-        raise HTTPException(status_code=404, detail="Item not found")
-
-    delete_resp = supabase.table("pantry").delete().eq("id", item_id).eq("user_id", user_id).execute()
+async def remove_pantry_item(item_id: int, user_id: str = Depends(get_current_user_id)):
+    delete_resp = await run_query(supabase.table("pantry").delete().eq("id", item_id).eq("user_id", user_id), "delete")
     if not delete_resp.data:
-        raise HTTPException(status_code=400, detail="Failed to delete pantry item")
+        raise HTTPException(status_code=404, detail="Item not found")
+    await pantry_removed(user_id, [item_id])
     return {"detail": "Item deleted successfully"}
 
-@app.get("/api/recipes")
-def suggest_recipes(user_id: str = Depends(get_current_user_id)):
-    response = supabase.table("pantry").select("*").eq("user_id", user_id).execute()
-    if response.data is None:
-        raise HTTPException(status_code=400, detail="Failed to fetch pantry items")
-    if len(response.data) == 0:
-        return {"recipes": "No pantry items found."}
-
+# 🔹 Batch routes (one statement per batch, scoped by user_id, per-item results)
+
+@app.post("/pantry/batch/add", status_code=201)
+async def batch_add_pantry_items(items: list[PantryItem], user_id: str = Depends(get_current_user_id)):
+    check_batch_size(items)
+    rows = [{**item.model_dump(), "user_id": user_id} for item in items]
+    response = await run_query(supabase.table("pantry").insert(rows), "insert")
+    if not response.data or len(response.data) != len(rows):
+        raise HTTPException(status_code=400, detail="Failed to insert pantry items")
+    await pantry_written(user_id, response.data)
+    return {"results": [
+        {"index": index, "status": "created", "item": row} for index, row in enumerate(response.data)
+    ]}
+
+@app.patch("/pantry/batch/update")
+async def batch_update_pantry_items(updates: list[PantryBatchUpdate], user_id: str = Depends(get_current_user_id)):
+    check_batch_size(updates)
+    # Last write wins for repeated ids; one UPDATE ... WHERE id IN (...) per distinct quantity.
+    quantities = {update.id: update.quantity for update in updates}
+    ids_by_quantity = {}
+    for item_id, quantity in quantities.items():
+        ids_by_quantity.setdefault(quantity, []).append(item_id)
+
+    slots = asyncio.Semaphore(BATCH_UPDATE_CONCURRENCY)
+    updated, failed = {}, set()
+
+    async def update_group(quantity, ids):
+        async with slots:
+            try:
+                response = await run_query(
+                    supabase.table("pantry").update({"quantity": quantity}).in_("id", ids).eq("user_id", user_id), "update"
+                )
+            except (PostgrestAPIError, httpx.HTTPError):
+                # Other groups may already be committed; report this one per item instead of failing the batch.
+                failed.update(ids)
+                return
+        updated.update((row["id"], row) for row in (response.data or []))
+
+    await asyncio.gather(*(update_group(quantity, ids) for quantity, ids in ids_by_quantity.items()))
+    if failed:
+        # A timed-out statement may still have committed: drop the cached pantry rather than guess.
+        await pantry_invalidated(user_id)
+    elif updated:
+        await pantry_written(user_id, list(updated.values()))
+    return {"results": [
+        {"id": item_id, "status": "updated", "item": updated[item_id]} if item_id in updated
+        else {"id": item_id, "status": "error", "detail": "Update failed"} if item_id in failed
+        else {"id": item_id, "status": "not_found"}
+        for item_id in quantities
+    ]}
+
+@app.post("/pantry/batch/remove")
+async def batch_remove_pantry_items(item_ids: list[int], user_id: str = Depends(get_current_user_id)):
+    check_batch_size(item_ids)
+    item_ids = list(dict.fromkeys(item_ids))
+    response = await run_query(supabase.table("pantry").delete().in_("id", item_ids).eq("user_id", user_id), "delete")
+    deleted = {row["id"] for row in (response.data or [])}
+    if deleted:
+        await pantry_removed(user_id, list(deleted))
+    return {"results": [
+        {"id": item_id, "status": "deleted" if item_id in deleted else "not_found"} for item_id in item_ids
+    ]}
+
+# 🔹 Recipe helpers
+AI_MODEL = "openai/gpt-oss-20b"
+# Bump whenever build_recipe_prompt/completion_request change, so cached recipes are not reused.
+RECIPE_PROMPT_VERSION = 1
+
+def build_recipe_prompt(pantry_rows):
     ingredients_list = ", ".join(
         f"{item['quantity']} {item['unit']} {item['item']}".strip()
-        for item in response.data
+        for item in pantry_rows
     )
 
-    ai_prompt = (
+    return (
         f"Suggest 2 creative recipes I can make using only: {ingredients_list}. "
         "Assume I have basic tools, equipment and basic ingredients. "
         "Include ingredients and step-by-step instructions. "
@@ -129,40 +580,219 @@ def suggest_recipes(user_id: str = Depends(get_current_user_id)):
         "Format each recipe starting with '### Recipe:' "
     )
 
-    ai_response = requests.post(
-        "https://openrouter.ai/api/v1/chat/completions",
-        headers={
-            "Authorization": f"Bearer {AI_API_KEY}",
-            "Content-Type": "application/json"
-        },
-        json={
-            "model": "openai/gpt-oss-20b",
-            "messages": [
-                {"role": "system", "content": "You are a helpful recipe assistant."},
-                {"role": "user", "content": ai_prompt}
-            ],
-            "temperature": 0.7,
-            "max_tokens": 2000
-        }
+def completion_request(ai_prompt: str, stream: bool = False):
+    body = {
+        "model": AI_MODEL,
+        "messages": [
+            {"role": "system", "content": "You are a helpful recipe assistant."},
+            {"role": "user", "content": ai_prompt}
+        ],
+        "temperature": 0.7,
+        "max_tokens": 2000
+    }
+    if stream:
+        body["stream"] = True
+    return body
+
+# 🔹 LLM client (OpenRouter; its http client is attached in lifespan())
+def make_llm_client(http: httpx.AsyncClient = None, **overrides):
+    options = dict(
+        timeout=httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+        max_retries=LLM_MAX_RETRIES,
+        backoff_base=LLM_BACKOFF_BASE,
+        backoff_max=LLM_BACKOFF_MAX,
+        retry_after_max=LLM_RETRY_AFTER_MAX,
+        breaker=CircuitBreaker(LLM_BREAKER_FAILURES, LLM_BREAKER_RESET),
+        limiter=ConcurrencyLimiter(LLM_MAX_CONCURRENCY, LLM_MAX_CONCURRENCY_PER_USER, LLM_QUEUE_TIMEOUT),
     )
+    options.update(overrides)
+    return LLMClient(http, **options)
 
-    if ai_response.status_code != 200:
-        raise HTTPException(status_code=500, detail=f"AI request failed: {ai_response.text}")
+llm_client = make_llm_client()
+
+def llm_http_error(exc: LLMError):
+    headers = {"Retry-After": str(max(1, round(exc.retry_after)))} if exc.retry_after is not None else None
+    return HTTPException(status_code=exc.status_code, detail=str(exc), headers=headers)
+
+async def generate_recipes(ai_prompt: str, user_id: str = None):
+    try:
+        with span("openrouter"):
+            data = await llm_client.complete(completion_request(ai_prompt), user_id=user_id)
+    except LLMError as exc:
+        raise llm_http_error(exc)
 
-    data = ai_response.json()
     recipe_text = None
     try:
         recipe_text = data["choices"][0]["message"]["content"]
-    except (KeyError, IndexError):
+    except (KeyError, IndexError, TypeError):
         try:
             recipe_text = data["choices"][0]["text"]
-        except (KeyError, IndexError):
-            recipe_text = "No recipes generated."
+        except (KeyError, IndexError, TypeError):
+            pass
+
+    # Raise rather than return a placeholder, so an empty completion is never cached.
+    if not isinstance(recipe_text, str) or not recipe_text.strip():
+        raise HTTPException(status_code=502, detail="AI request failed: no recipes in the response")
+    return recipe_text
+
+async def llm_recipes(user_id: str, pantry_rows: list):
+    cache_key = pantry_fingerprint(pantry_rows, AI_MODEL, RECIPE_PROMPT_VERSION)
+    return await recipe_cache.get_or_generate(
+        user_id, cache_key, lambda: generate_recipes(build_recipe_prompt(pantry_rows), user_id)
+    )
+
+def local_recipe_matches(pantry_rows: list):
+    try:
+        index = get_recipe_index()
+    except (OSError, ValueError):
+        return None
+    return index.match([row["item"] for row in pantry_rows], k=RECIPE_LOCAL_TOP_K)
+
+def local_recipes_response(matches: list):
+    return {
+        "recipes": format_recipes(matches) or "No matching recipes found.",
+        "engine": "local",
+        "matches": [
+            {"title": match["recipe"]["title"], "coverage": match["coverage"], "missing": match["missing"]}
+            for match in matches
+        ],
+    }
 
-    return {"recipes": recipe_text}
+@app.get("/api/recipes")
+async def suggest_recipes(
+    engine: Literal["llm", "local", "auto"] = "llm",
+    user_id: str = Depends(get_current_user_id),
+):
+    """
+    engine=llm (default) asks the model; engine=local matches the recipe corpus;
+    engine=auto answers locally when the best match covers enough of the recipe,
+    and otherwise asks the model, falling back to the local matches if it errors
+    or takes longer than RECIPE_AUTO_LLM_TIMEOUT.
+    """
+    pantry_rows = await load_pantry_rows(user_id)
+    if len(pantry_rows) == 0:
+        return {"recipes": "No pantry items found."}
+
+    if engine == "llm":
+        return {"recipes": await llm_recipes(user_id, pantry_rows)}
+
+    matches = local_recipe_matches(pantry_rows)
+    if engine == "local":
+        if matches is None:
+            raise HTTPException(status_code=503, detail="Local recipe engine unavailable")
+        return local_recipes_response(matches)
+
+    if matches and matches[0]["coverage"] >= RECIPE_AUTO_MIN_COVERAGE:
+        return local_recipes_response(matches)
+    try:
+        # The generation is shielded inside the cache, so a timeout here still lets it finish and be cached.
+        recipe_text = await asyncio.wait_for(llm_recipes(user_id, pantry_rows), RECIPE_AUTO_LLM_TIMEOUT)
+    except (asyncio.TimeoutError, HTTPException) as exc:
+        if matches:
+            return local_recipes_response(matches)
+        if isinstance(exc, HTTPException):
+            raise
+        raise HTTPException(status_code=504, detail="AI request timed out")
+    return {"recipes": recipe_text, "engine": "llm"}
+
+@app.get("/api/recipes/cache", dependencies=[Depends(require_metrics_token)])
+async def recipe_cache_stats():
+    return recipe_cache.snapshot()
+
+@REGISTRY.collector
+def cache_and_llm_metrics():
+    recipes = recipe_cache.snapshot()
+    llm = llm_client.snapshot()
+    metrics = [
+        ("recipe_cache_events_total", "Recipe cache lookups and invalidations.", "counter", [
+            ({"event": event}, recipes[event]) for event in ("hits", "misses", "coalesced", "invalidations")
+        ]),
+        ("llm_in_flight", "OpenRouter generations in progress.", "gauge", [({}, llm["in_flight"])]),
+        ("llm_max_concurrency", "Generation slots per process.", "gauge", [({}, llm["max_concurrency"])]),
+        ("llm_circuit_open", "1 while the OpenRouter circuit breaker rejects calls.", "gauge", [
+            ({}, int(llm["circuit"] == "open"))
+        ]),
+        ("llm_consecutive_failures", "OpenRouter failures since the last success.", "gauge", [
+            ({}, llm["consecutive_failures"])
+        ]),
+    ]
+    if pantry_cache is not None:
+        metrics.append(("pantry_cache_events_total", "Pantry cache lookups.", "counter", [
+            ({"event": event}, count) for event, count in pantry_cache.stats.items()
+        ]))
+    return metrics
+
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_metrics_token)])
+async def prometheus_metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+async def cached_recipe_events(recipe_text: str):
+    splitter = RecipeSplitter()
+    recipes = splitter.feed(recipe_text) + splitter.flush()
+    for index, recipe in enumerate(recipes):
+        yield sse_event("recipe", {"index": index, "recipe": recipe})
+    yield sse_event("done", {"count": len(recipes), "cached": True})
+
+async def stream_recipe_events(request: Request, ai_prompt: str, on_complete=None, user_id: str = None):
+    """
+    Relay an OpenRouter stream as SSE, one `recipe` event per '### Recipe:' section.
+    Stops reading (and closes the upstream connection) as soon as the client goes away.
+    on_complete(full_text) is called only if the whole generation was received.
+    """
+    splitter = RecipeSplitter()
+    recipes = []
+    try:
+        # Headers are long gone by the end of a stream, so this span only reaches /metrics.
+        async with span("openrouter.stream"), llm_client.stream(completion_request(ai_prompt, stream=True), user_id=user_id) as ai_response:
+            async for delta in iter_sse_deltas(ai_response.aiter_lines()):
+                if await request.is_disconnected():
+                    return
+                for recipe in splitter.feed(delta):
+                    yield sse_event("recipe", {"index": len(recipes), "recipe": recipe})
+                    recipes.append(recipe)
+    except LLMError as exc:
+        yield sse_event("error", {"detail": str(exc), "status": exc.status_code})
+        return
+    except RuntimeError as exc:
+        # An error object inside the stream, after a 200.
+        yield sse_event("error", {"detail": f"AI request failed: {exc}", "status": 502})
+        return
+
+    for recipe in splitter.flush():
+        yield sse_event("recipe", {"index": len(recipes), "recipe": recipe})
+        recipes.append(recipe)
+    if on_complete is not None and recipes:
+        on_complete("\n\n".join(recipes))
+    yield sse_event("done", {"count": len(recipes)})
+
+@app.get("/api/recipes/stream")
+async def stream_recipes(request: Request, user_id: str = Depends(get_current_user_id)):
+    pantry_rows = await load_pantry_rows(user_id)
+    if len(pantry_rows) == 0:
+        async def empty():
+            yield sse_event("done", {"count": 0, "detail": "No pantry items found."})
+        events = empty()
+    else:
+        cache_key = pantry_fingerprint(pantry_rows, AI_MODEL, RECIPE_PROMPT_VERSION)
+        cached = recipe_cache.get(user_id, cache_key)
+        if cached is not None:
+            events = cached_recipe_events(cached)
+        else:
+            events = stream_recipe_events(
+                request,
+                build_recipe_prompt(pantry_rows),
+                on_complete=lambda text: recipe_cache.set(user_id, cache_key, text),
+                user_id=user_id,
+            )
+
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @app.get("/")
-def root():
+async def root():
     return {"message": "Welcome to Pantry API!"}
 
 
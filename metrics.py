@@ -0,0 +1,180 @@
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+
+from starlette.datastructures import MutableHeaders
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _number(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram, one series per label combination."""
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                # Per-bucket counts (not cumulative) plus a +Inf slot, then sum.
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def count(self, *labelvalues):
+        series = self._series.get(labelvalues)
+        return sum(series[0]) if series else 0
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, list(counts), total) for labels, (counts, total) in self._series.items())
+        for labelvalues, counts, total in series:
+            names = self.labelnames + ("le",)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                lines.append(f"{self.name}_bucket{_labels(names, labelvalues + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labelvalues)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labelvalues)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Histograms plus collectors: callables returning (name, help, type, [(labels dict, value)])."""
+
+    def __init__(self):
+        self.histograms = []
+        self.collectors = []
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        histogram = Histogram(name, help, labelnames, buckets)
+        self.histograms.append(histogram)
+        return histogram
+
+    def collector(self, collect):
+        self.collectors.append(collect)
+        return collect
+
+    def render(self):
+        lines = []
+        for histogram in self.histograms:
+            lines += histogram.render()
+        for collect in self.collectors:
+            for name, help, kind, samples in collect():
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(tuple(labels), tuple(labels.values()))} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "Time to the end of the response, by route template.", ("method", "route", "status")
+)
+SPAN_SECONDS = REGISTRY.histogram("app_span_duration_seconds", "Time spent in instrumented steps.", ("span",))
+
+# Spans finished during the current request, for its Server-Timing header.
+_request_spans = contextvars.ContextVar("request_spans", default=None)
+
+
+class span:
+    """
+    Time a block: `with span("supabase.select"):` (or `async with`). Feeds
+    SPAN_SECONDS and, inside a request, that request's Server-Timing header
+    (if it ends before the headers go out).
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        duration = time.perf_counter() - self.start
+        SPAN_SECONDS.observe(duration, self.name)
+        spans = _request_spans.get()
+        if spans is not None:
+            spans.append((self.name, duration))
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, *exc):
+        return self.__exit__(*exc)
+
+
+def server_timing(spans, total):
+    """Server-Timing value: spans with the same name are summed, then the request total."""
+    durations = {}
+    for name, duration in spans:
+        durations[name] = durations.get(name, 0.0) + duration
+    entries = [f"{name};dur={duration * 1000:.1f}" for name, duration in durations.items()]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (so streaming responses pass straight through):
+    records REQUEST_SECONDS per route template and adds a Server-Timing header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        spans = []
+        token = _request_spans.set(spans)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", server_timing(spans, time.perf_counter() - start))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_spans.reset(token)
+            route = scope.get("route")
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status),
+            )
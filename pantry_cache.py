@@ -0,0 +1,207 @@
+import json
+import time
+from collections import OrderedDict
+
+try:
+    from redis.exceptions import WatchError
+except ImportError:  # only the Redis backend needs it
+    class WatchError(Exception):
+        pass
+
+
+class MemoryPantryBackend:
+    """Per-process store of each user's pantry rows, LRU-evicted by user with a TTL."""
+
+    def __init__(self, max_users=1024, ttl=300, clock=time.monotonic):
+        self.max_users = max_users
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+
+    def _live(self, user_id):
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        rows, expires_at = entry
+        if expires_at <= self.clock():
+            del self._entries[user_id]
+            return None
+        return rows
+
+    async def get(self, user_id):
+        rows = self._live(user_id)
+        if rows is None:
+            return None
+        self._entries.move_to_end(user_id)
+        return [dict(row) for row in rows.values()]
+
+    async def version(self, user_id):
+        # In one process PantryCache's own load/write tracking is enough.
+        return None
+
+    async def set(self, user_id, rows, version=None):
+        self._entries[user_id] = ({row["id"]: dict(row) for row in rows}, self.clock() + self.ttl)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_users:
+            self._entries.popitem(last=False)
+
+    async def upsert_rows(self, user_id, rows):
+        cached = self._live(user_id)
+        if cached is not None:
+            for row in rows:
+                cached[row["id"]] = dict(row)
+
+    async def delete_rows(self, user_id, item_ids):
+        cached = self._live(user_id)
+        if cached is not None:
+            for item_id in item_ids:
+                cached.pop(item_id, None)
+
+    async def delete(self, user_id):
+        self._entries.pop(user_id, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisPantryBackend:
+    """
+    Shared store for several workers, using any client with the redis.asyncio
+    hash API (hset/hgetall/hexists/hdel/expire/delete/get/incr/pipeline). Each user is one hash
+    of row id -> JSON row, so write-through is a single HSET/HDEL rather than a
+    read-modify-write. A marker field tells an empty pantry apart from a miss;
+    eviction is left to the TTL and the server's maxmemory policy.
+
+    Every write bumps a per-user version key, and a load is only stored if the
+    version is unchanged (WATCH/MULTI), so a load on one worker that overlaps a
+    write on another can't cache rows from before the write.
+    """
+
+    LOADED = "__loaded__"
+
+    def __init__(self, client, ttl=300, prefix="pantry:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _key(self, user_id):
+        return f"{self.prefix}{user_id}"
+
+    def _version_key(self, user_id):
+        return f"{self.prefix}{user_id}:version"
+
+    def _bump(self, pipe, user_id):
+        pipe.incr(self._version_key(user_id))
+        pipe.expire(self._version_key(user_id), self.ttl)
+
+    async def get(self, user_id):
+        entry = await self.client.hgetall(self._key(user_id))
+        entry = {_text(field): value for field, value in entry.items()}
+        if self.LOADED not in entry:
+            return None
+        return [json.loads(value) for field, value in entry.items() if field != self.LOADED]
+
+    async def version(self, user_id):
+        return _text(await self.client.get(self._version_key(user_id)))
+
+    async def set(self, user_id, rows, version=None):
+        """Store a load; pass the version() read before loading to skip it if a write landed since."""
+        key = self._key(user_id)
+        mapping = {str(row["id"]): json.dumps(row) for row in rows}
+        mapping[self.LOADED] = "1"
+        async with self.client.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(self._version_key(user_id))
+                if _text(await pipe.get(self._version_key(user_id))) != version:
+                    return
+                pipe.multi()
+                pipe.delete(key)
+                pipe.hset(key, mapping=mapping)
+                pipe.expire(key, self.ttl)
+                await pipe.execute()
+            except WatchError:
+                pass  # written while storing: the next read reloads
+
+    async def upsert_rows(self, user_id, rows):
+        if not rows:
+            return
+        key = self._key(user_id)
+        async with self.client.pipeline(transaction=True) as pipe:
+            self._bump(pipe, user_id)
+            pipe.hexists(key, self.LOADED)
+            *_, loaded = await pipe.execute()
+        # Only patch an entry that is fully loaded; otherwise the next read reloads it.
+        if not loaded:
+            return
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping={str(row["id"]): json.dumps(row) for row in rows})
+            # If the entry expired in between, don't leave a partial hash without a TTL.
+            pipe.expire(key, self.ttl, nx=True)
+            await pipe.execute()
+
+    async def delete_rows(self, user_id, item_ids):
+        if not item_ids:
+            return
+        async with self.client.pipeline(transaction=True) as pipe:
+            self._bump(pipe, user_id)
+            pipe.hdel(self._key(user_id), *(str(item_id) for item_id in item_ids))
+            await pipe.execute()
+
+    async def delete(self, user_id):
+        async with self.client.pipeline(transaction=True) as pipe:
+            self._bump(pipe, user_id)
+            pipe.delete(self._key(user_id))
+            await pipe.execute()
+
+
+def _text(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class PantryCache:
+    """Read-through cache of a user's full pantry, kept current by the routes that write it."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.stats = {"hits": 0, "misses": 0}
+        self._loading = {}
+        self._dirty = set()
+
+    async def rows(self, user_id, load):
+        rows = await self.backend.get(user_id)
+        if rows is not None:
+            self.stats["hits"] += 1
+            return sorted(rows, key=lambda row: row["id"])
+        self.stats["misses"] += 1
+
+        version = await self.backend.version(user_id)
+        self._loading[user_id] = self._loading.get(user_id, 0) + 1
+        try:
+            rows = await load(user_id)
+        finally:
+            self._loading[user_id] -= 1
+            stale = user_id in self._dirty
+            if not self._loading[user_id]:
+                del self._loading[user_id]
+                self._dirty.discard(user_id)
+        # A write that landed while we were loading may be missing from `rows`;
+        # serve them, but don't cache them. Writes from other workers are caught
+        # by the backend's version check.
+        if not stale:
+            await self.backend.set(user_id, rows, version)
+        return rows
+
+    def _mark_written(self, user_id):
+        if user_id in self._loading:
+            self._dirty.add(user_id)
+
+    async def written(self, user_id, rows):
+        self._mark_written(user_id)
+        await self.backend.upsert_rows(user_id, rows)
+
+    async def removed(self, user_id, item_ids):
+        self._mark_written(user_id)
+        await self.backend.delete_rows(user_id, item_ids)
+
+    async def invalidate(self, user_id):
+        await self.backend.delete(user_id)
@@ -0,0 +1,214 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+def pantry_fingerprint(pantry_rows, model, prompt_version):
+    """
+    Stable key for a pantry: the sorted (item, quantity, unit) tuples that feed
+    the prompt, plus the model and prompt version. Row ids and order don't matter.
+    """
+    items = sorted(
+        (str(row["item"]).strip().lower(), row["quantity"], str(row.get("unit") or "").strip().lower())
+        for row in pantry_rows
+    )
+    payload = json.dumps([model, prompt_version, items], separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class MemoryBackend:
+    """In-process LRU with a per-entry TTL."""
+
+    def __init__(self, maxsize=512, ttl=3600, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= self.clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        self._entries[key] = (value, self.clock() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def delete(self, key):
+        self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """
+    On-disk LRU+TTL store, so cached recipes survive restarts and are shared by
+    local workers. It is called from the event loop, so each write is a single
+    WAL transaction with synchronous=NORMAL: no fsync per commit (a crash can
+    lose the last few entries, which is fine for a cache).
+    """
+
+    def __init__(self, path, maxsize=10000, ttl=3600, clock=time.time):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS recipe_cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS recipe_cache_accessed ON recipe_cache (accessed_at)")
+
+    @contextmanager
+    def _transaction(self):
+        self._conn.execute("BEGIN")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def get(self, key):
+        now = self.clock()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM recipe_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM recipe_cache WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE recipe_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        now = self.clock()
+        with self._lock, self._transaction():
+            self._conn.execute(
+                "INSERT OR REPLACE INTO recipe_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + self.ttl, now),
+            )
+            self._conn.execute("DELETE FROM recipe_cache WHERE expires_at <= ?", (now,))
+            self._conn.execute(
+                "DELETE FROM recipe_cache WHERE key IN ("
+                " SELECT key FROM recipe_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,),
+            )
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM recipe_cache WHERE key = ?", (key,))
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM recipe_cache").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+
+class RecipeCache:
+    """
+    Recipe results keyed by user and pantry fingerprint, so invalidating one
+    user never drops another's entries. Concurrent misses for the same key
+    share one in-flight generation. Backends are small synchronous stores
+    (get/set/delete, with a maxsize) and are called directly from the event loop.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "invalidations": 0}
+        self._inflight = {}
+        # Which entries belong to which user, for invalidate(). An LRU of the
+        # same size as the backend's, so it forgets entries the backend has evicted.
+        self._owners = OrderedDict()
+        self._user_keys = {}
+
+    @staticmethod
+    def _entry(user_id, key):
+        return f"{user_id}:{key}"
+
+    def get(self, user_id, key):
+        entry = self._entry(user_id, key)
+        value = self.backend.get(entry)
+        if value is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        self._track(user_id, entry)
+        return value
+
+    def set(self, user_id, key, value):
+        entry = self._entry(user_id, key)
+        self.backend.set(entry, value)
+        self._track(user_id, entry)
+
+    def _track(self, user_id, entry):
+        self._owners[entry] = user_id
+        self._owners.move_to_end(entry)
+        self._user_keys.setdefault(user_id, set()).add(entry)
+        while len(self._owners) > self.backend.maxsize:
+            old_entry, old_user = self._owners.popitem(last=False)
+            entries = self._user_keys[old_user]
+            entries.discard(old_entry)
+            if not entries:
+                del self._user_keys[old_user]
+
+    async def get_or_generate(self, user_id, key, generate):
+        """Return the cached value for key, or await generate() once for all concurrent callers."""
+        value = self.get(user_id, key)
+        if value is not None:
+            return value
+
+        entry = self._entry(user_id, key)
+        task = self._inflight.get(entry)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            task = asyncio.ensure_future(generate())
+            self._inflight[entry] = task
+            task.add_done_callback(lambda t: self._finish(user_id, key, t))
+        # shield: one caller disconnecting must not cancel the generation for the others.
+        return await asyncio.shield(task)
+
+    def _finish(self, user_id, key, task):
+        self._inflight.pop(self._entry(user_id, key), None)
+        if not task.cancelled() and task.exception() is None:
+            self.set(user_id, key, task.result())
+
+    def invalidate(self, user_id):
+        entries = self._user_keys.pop(user_id, ())
+        for entry in entries:
+            self._owners.pop(entry, None)
+            self.backend.delete(entry)
+        if entries:
+            self.stats["invalidations"] += 1
+
+    def snapshot(self):
+        # "coalesced" misses joined an in-flight generation instead of starting one.
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "inflight": len(self._inflight),
+            "size": len(self.backend),
+            "hit_ratio": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+        }
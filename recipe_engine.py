@@ -0,0 +1,217 @@
+import csv
+import json
+import re
+from array import array
+
+# Things the LLM prompt already assumes are on hand ("basic ingredients").
+STAPLES = frozenset({"salt", "pepper", "black pepper", "water", "oil", "olive oil", "vegetable oil", "sugar"})
+
+# Units and preparation words that don't change what the ingredient is.
+_DESCRIPTORS = frozenset({
+    "fresh", "frozen", "chopped", "diced", "sliced", "minced", "large", "small", "medium",
+    "whole", "dried", "raw", "cooked", "boneless", "skinless", "organic", "canned", "of",
+    "g", "kg", "mg", "ml", "l", "oz", "lb", "lbs", "tsp", "tbsp", "cup", "cups", "pinch",
+    "clove", "cloves", "slice", "slices", "can", "cans", "handful", "piece", "pieces",
+})
+_WORD = re.compile(r"[a-z]+")
+
+
+def _singular(word):
+    if len(word) <= 3 or word.endswith("ss"):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("oes", "ches", "shes", "xes")):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def normalize_ingredient(name):
+    """'2 Fresh Tomatoes, diced' -> 'tomato'. Used for both pantry items and corpus ingredients."""
+    words = [_singular(word) for word in _WORD.findall(str(name).lower()) if word not in _DESCRIPTORS]
+    return " ".join(words)
+
+
+def _bitset(indexes, nbytes):
+    buf = bytearray(nbytes)
+    for index in indexes:
+        buf[index >> 3] |= 1 << (index & 7)
+    return int.from_bytes(buf, "little")
+
+
+class RecipeIndex:
+    """
+    Inverted index from normalized ingredient to the recipes that use it.
+    Scoring works on bitsets over the corpus (bit i = recipe i): per-recipe
+    hit counts are summed with a bit-sliced adder, so a query costs a few
+    big-int operations per pantry item instead of a loop over every posting.
+    """
+
+    def __init__(self, recipes, staples=STAPLES):
+        self.recipes = []
+        self.sizes = array("H")
+        # Staples count as on hand, so they're folded into a per-recipe constant.
+        self.staple_counts = array("H")
+        self.vocab = {}
+        self.postings = []
+        self._staples = [frozenset(normalize_ingredient(staple).split()) for staple in staples]
+        self._is_staple = []
+        # Built on first match after an add: bitsets of common ingredients
+        # (rare ones are cheaper to build per query) and of recipes grouped by
+        # (size, staple count), since those two fix a recipe's coverage for a hit count.
+        self._dense = {}
+        self._groups = {}
+        self._prepared = 0
+        for recipe in recipes:
+            self.add(recipe)
+
+    def add(self, recipe):
+        index = len(self.recipes)
+        ingredient_ids = set()
+        for ingredient in recipe["ingredients"]:
+            name = normalize_ingredient(ingredient)
+            if not name:
+                continue
+            ingredient_id = self.vocab.get(name)
+            if ingredient_id is None:
+                ingredient_id = self.vocab[name] = len(self.postings)
+                self.postings.append(array("I"))
+                tokens = frozenset(name.split())
+                self._is_staple.append(any(tokens <= staple for staple in self._staples))
+            ingredient_ids.add(ingredient_id)
+        for ingredient_id in ingredient_ids:
+            self.postings[ingredient_id].append(index)
+        self.recipes.append(recipe)
+        self.sizes.append(len(ingredient_ids))
+        self.staple_counts.append(sum(self._is_staple[ingredient_id] for ingredient_id in ingredient_ids))
+
+    def _expand(self, names):
+        """
+        Vocabulary ids for normalized names and their trailing words (the head
+        noun): "cheddar cheese" also covers "cheese", but "egg noodles" doesn't
+        cover "egg".
+        """
+        ids = set()
+        for name in names:
+            words = name.split()
+            for start in range(len(words)):
+                ingredient_id = self.vocab.get(" ".join(words[start:]))
+                if ingredient_id is not None:
+                    ids.add(ingredient_id)
+        return ids
+
+    def _prepare(self):
+        if self._prepared == len(self.recipes):
+            return
+        nbytes = (len(self.recipes) + 7) // 8
+        self._dense = {
+            ingredient_id: _bitset(postings, nbytes)
+            for ingredient_id, postings in enumerate(self.postings)
+            if len(postings) * 32 >= len(self.recipes)  # denser than the posting array
+        }
+        groups = {}
+        for index, key in enumerate(zip(self.sizes, self.staple_counts)):
+            groups.setdefault(key, []).append(index)
+        self._groups = {key: _bitset(indexes, nbytes) for key, indexes in groups.items()}
+        self._prepared = len(self.recipes)
+
+    def match(self, pantry_items, k=5, min_coverage=0.0):
+        """
+        Top-k recipes by pantry coverage (share of a recipe's ingredients on hand),
+        ties broken by number of matched ingredients, then corpus order.
+        """
+        self._prepare()
+        nbytes = (len(self.recipes) + 7) // 8
+        have = {
+            ingredient_id for ingredient_id in self._expand({normalize_ingredient(item) for item in pantry_items})
+            if not self._is_staple[ingredient_id]
+        }
+        # Only recipes that use at least one pantry item are candidates.
+        candidates = 0
+        planes = []  # planes[j] has bit i set when bit j of recipe i's hit count is 1
+        for ingredient_id in have:
+            bits = self._dense.get(ingredient_id)
+            if bits is None:
+                bits = _bitset(self.postings[ingredient_id], nbytes)
+            candidates |= bits
+            carry = bits
+            for j, plane in enumerate(planes):
+                planes[j] = plane ^ carry
+                carry &= plane
+                if not carry:
+                    break
+            else:
+                if carry:
+                    planes.append(carry)
+
+        scored = {}  # (coverage, hits) -> bitset of recipes
+        for hits in range(1, 1 << len(planes)):
+            exact = candidates
+            for j, plane in enumerate(planes):
+                exact = exact & plane if hits >> j & 1 else exact & ~plane
+                if not exact:
+                    break
+            if not exact:
+                continue
+            for (size, staples), group in self._groups.items():
+                found = exact & group
+                coverage = (hits + staples) / size if found else 0.0
+                if found and coverage >= min_coverage:
+                    scored[coverage, hits] = scored.get((coverage, hits), 0) | found
+
+        matches = []
+        for coverage, hits in sorted(scored, reverse=True):
+            found = scored[coverage, hits]
+            while found and len(matches) < k:
+                lowest = found & -found
+                found ^= lowest
+                matches.append(self._match(lowest.bit_length() - 1, coverage, have))
+            if len(matches) >= k:
+                break
+        return matches
+
+    def _match(self, index, coverage, have):
+        recipe = self.recipes[index]
+        missing = []
+        for ingredient in recipe["ingredients"]:
+            ingredient_id = self.vocab.get(normalize_ingredient(ingredient))
+            if ingredient_id is not None and ingredient_id not in have and not self._is_staple[ingredient_id]:
+                missing.append(ingredient)
+        return {"recipe": recipe, "coverage": round(coverage, 4), "missing": missing}
+
+    def __len__(self):
+        return len(self.recipes)
+
+
+def load_recipes(path):
+    """
+    Read a recipe corpus. JSON: a list of {"title", "ingredients": [...], "instructions"}.
+    CSV: title, ingredients ("; "-separated) and instructions columns.
+    """
+    if str(path).endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            return [
+                {
+                    "title": row["title"],
+                    "ingredients": [part.strip() for part in row["ingredients"].split(";") if part.strip()],
+                    "instructions": row.get("instructions", ""),
+                }
+                for row in csv.DictReader(f)
+            ]
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def format_recipes(matches):
+    """Render matches in the same '### Recipe:' markdown the LLM is asked to produce."""
+    sections = []
+    for match in matches:
+        recipe = match["recipe"]
+        instructions = recipe.get("instructions") or ""
+        if isinstance(instructions, list):
+            instructions = "\n".join(f"{number}. {step}" for number, step in enumerate(instructions, 1))
+        ingredients = "\n".join(f"- {ingredient}" for ingredient in recipe["ingredients"])
+        sections.append(f"### Recipe: {recipe['title']}\n\n**Ingredients**\n{ingredients}\n\n**Instructions**\n{instructions}")
+    return "\n\n".join(sections)
@@ -0,0 +1,63 @@
+import json
+
+RECIPE_MARKER = "### Recipe:"
+
+
+async def iter_sse_deltas(lines):
+    """
+    Yield content deltas from an OpenRouter (OpenAI-style) SSE stream.
+    `lines` is an async iterator of decoded lines, e.g. httpx's Response.aiter_lines().
+    """
+    async for line in lines:
+        # Blank lines separate events; lines starting with ":" are keep-alive comments.
+        if not line.startswith("data:"):
+            continue
+        payload = line[len("data:"):].strip()
+        if payload == "[DONE]":
+            return
+        try:
+            chunk = json.loads(payload)
+        except ValueError:
+            continue
+        if "error" in chunk:
+            raise RuntimeError(chunk["error"].get("message", "upstream error"))
+        for choice in chunk.get("choices", []):
+            delta = choice.get("delta") or {}
+            text = delta.get("content") or choice.get("text")
+            if text:
+                yield text
+
+
+class RecipeSplitter:
+    """Accumulate streamed text and cut it into whole recipes at '### Recipe:' boundaries."""
+
+    def __init__(self, marker=RECIPE_MARKER):
+        self.marker = marker
+        self.buffer = ""
+
+    def feed(self, text):
+        self.buffer += text
+        recipes = []
+        while True:
+            start = self.buffer.find(self.marker)
+            if start == -1:
+                break
+            end = self.buffer.find(self.marker, start + len(self.marker))
+            if end == -1:
+                # Drop any preamble before the first recipe; keep the partial recipe.
+                self.buffer = self.buffer[start:]
+                break
+            recipes.append(self.buffer[start:end].strip())
+            self.buffer = self.buffer[end:]
+        return recipes
+
+    def flush(self):
+        rest, self.buffer = self.buffer.strip(), ""
+        if not rest:
+            return []
+        # If the model ignored the format, hand back everything as one recipe.
+        return [rest]
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
@@ -0,0 +1,245 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import time
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from auth import AuthUnavailable, InvalidToken, JWKSCache, TokenCache, TokenVerifier
+
+SECRET = "test-jwt-secret-with-enough-length-for-hs256"
+
+
+def mint(claims=None, key=SECRET, alg="HS256", headers=None, **overrides):
+    payload = {"sub": "user-123", "aud": "authenticated", "exp": int(time.time()) + 3600}
+    payload.update(claims or {})
+    payload.update(overrides)
+    return jwt.encode(payload, key, algorithm=alg, headers=headers)
+
+
+def verify(verifier, token):
+    return asyncio.run(verifier.verify(token))
+
+
+def static_jwks(jwks, calls=None):
+    async def fetch():
+        if calls is not None:
+            calls.append(1)
+        return jwks() if callable(jwks) else jwks
+    return fetch
+
+
+def rsa_jwk(kid):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk.update({"kid": kid, "alg": "RS256", "use": "sig"})
+    return private_key, jwk
+
+
+def test_hs256_token_verified_locally():
+    verifier = TokenVerifier(secret=SECRET)
+    assert verify(verifier, mint()) == "user-123"
+
+
+@pytest.mark.parametrize("token", [
+    mint(exp=int(time.time()) - 10),
+    mint(aud="anon"),
+    mint(key="some-other-secret-of-sufficient-length"),
+    "not-a-jwt",
+])
+def test_invalid_tokens_rejected(token):
+    verifier = TokenVerifier(secret=SECRET)
+    with pytest.raises(InvalidToken):
+        verify(verifier, token)
+
+
+def test_missing_sub_rejected():
+    token = jwt.encode({"aud": "authenticated", "exp": int(time.time()) + 60}, SECRET, algorithm="HS256")
+    with pytest.raises(InvalidToken):
+        verify(TokenVerifier(secret=SECRET), token)
+
+
+def test_hs_token_rejected_without_secret():
+    with pytest.raises(InvalidToken):
+        verify(TokenVerifier(), mint())
+
+
+def test_verified_tokens_are_cached():
+    verifier = TokenVerifier(secret=SECRET)
+    token = mint()
+    verify(verifier, token)
+    verifier.secret = "rotated-away-secret-of-sufficient-length"
+    assert verify(verifier, token) == "user-123"
+
+
+def test_cache_respects_token_expiry_and_size():
+    now = [1000.0]
+    cache = TokenCache(maxsize=2, ttl=300, clock=lambda: now[0])
+    cache.set("a", "user-a", exp=1010)
+    cache.set("b", "user-b")
+    assert cache.get("a") == "user-a"
+    cache.set("c", "user-c")
+    assert cache.get("b") is None  # least recently used was evicted
+    now[0] = 1011
+    assert cache.get("a") is None
+    assert cache.get("c") == "user-c"
+    now[0] = 1301
+    assert cache.get("c") is None
+
+
+def test_rs256_token_verified_against_jwks():
+    private_key, jwk = rsa_jwk("key-1")
+    calls = []
+    verifier = TokenVerifier(jwks=JWKSCache("https://example/jwks", fetch=static_jwks({"keys": [jwk]}, calls)))
+    token = mint(key=private_key, alg="RS256", headers={"kid": "key-1"})
+    assert verify(verifier, token) == "user-123"
+    verify(verifier, mint(key=private_key, alg="RS256", headers={"kid": "key-1"}, sub="user-456"))
+    assert len(calls) == 1
+
+
+def test_jwks_refetched_on_key_rotation():
+    now = [1000.0]
+    old_key, old_jwk = rsa_jwk("old")
+    new_key, new_jwk = rsa_jwk("new")
+    published = {"keys": [old_jwk]}
+    jwks = JWKSCache("https://example/jwks", fetch=static_jwks(lambda: published), min_refresh_interval=30, clock=lambda: now[0])
+    verifier = TokenVerifier(jwks=jwks)
+
+    assert verify(verifier, mint(key=old_key, alg="RS256", headers={"kid": "old"})) == "user-123"
+
+    published = {"keys": [old_jwk, new_jwk]}
+    token = mint(key=new_key, alg="RS256", headers={"kid": "new"}, sub="user-new")
+    # Within the refresh interval an unknown kid does not trigger a refetch.
+    with pytest.raises(InvalidToken):
+        verify(verifier, token)
+    now[0] += 31
+    assert verify(verifier, token) == "user-new"
+
+
+def test_hs_token_cannot_be_verified_with_public_key():
+    # alg confusion: an HS256 token signed with the JWKS public key must not verify.
+    _, jwk = rsa_jwk("key-1")
+    verifier = TokenVerifier(jwks=JWKSCache("https://example/jwks", fetch=static_jwks({"keys": [jwk]})))
+    header = jwt.utils.base64url_encode(json.dumps({"alg": "HS256", "typ": "JWT", "kid": "key-1"}).encode())
+    claims = jwt.utils.base64url_encode(json.dumps(
+        {"sub": "attacker", "aud": "authenticated", "exp": int(time.time()) + 60}
+    ).encode())
+    signing_input = header + b"." + claims
+    signature = hmac.new(json.dumps(jwk).encode(), signing_input, hashlib.sha256).digest()
+    token = (signing_input + b"." + jwt.utils.base64url_encode(signature)).decode()
+    with pytest.raises(InvalidToken):
+        verify(verifier, token)
+
+
+def test_remote_fallback_only_when_configured():
+    token = mint(key="unknown-secret-of-sufficient-length")
+    with pytest.raises(InvalidToken):
+        verify(TokenVerifier(secret=SECRET), token)
+
+    lookups = []
+
+    async def remote(t):
+        lookups.append(t)
+        return "remote-user"
+
+    verifier = TokenVerifier(secret=SECRET, remote_lookup=remote)
+    assert verify(verifier, token) == "remote-user"
+    assert verify(verifier, token) == "remote-user"
+    assert lookups == [token]
+
+
+def test_remote_fallback_rejects_unknown_user():
+    async def remote(t):
+        return None
+
+    verifier = TokenVerifier(remote_lookup=remote)
+    with pytest.raises(InvalidToken):
+        verify(verifier, mint())
+
+
+def test_remote_rejections_are_cached_briefly():
+    now = [1000.0]
+    lookups = []
+
+    async def remote(t):
+        lookups.append(t)
+        raise InvalidToken("expired")
+
+    verifier = TokenVerifier(secret=SECRET, remote_lookup=remote, negative_ttl=30)
+    verifier.rejected.clock = lambda: now[0]
+    expired = mint(exp=int(time.time()) - 60)
+    for _ in range(3):
+        with pytest.raises(InvalidToken):
+            verify(verifier, expired)
+    assert lookups == [expired]
+
+    now[0] += 31
+    with pytest.raises(InvalidToken):
+        verify(verifier, expired)
+    assert len(lookups) == 2
+
+
+def test_remote_outages_are_not_cached_as_rejections():
+    calls = []
+
+    async def remote(t):
+        calls.append(t)
+        if len(calls) == 1:
+            raise AuthUnavailable("auth server unreachable")
+        return "remote-user"
+
+    verifier = TokenVerifier(remote_lookup=remote)
+    token = mint()
+    with pytest.raises(AuthUnavailable):
+        verify(verifier, token)
+    assert verify(verifier, token) == "remote-user"
+
+
+def test_jwks_outage_on_cold_start_is_unavailable_not_invalid():
+    private_key, jwk = rsa_jwk("key-1")
+    up = [False]
+
+    async def fetch():
+        if not up[0]:
+            raise OSError("connection refused")
+        return {"keys": [jwk]}
+
+    verifier = TokenVerifier(jwks=JWKSCache("https://example/jwks", fetch=fetch))
+    token = mint(key=private_key, alg="RS256", headers={"kid": "key-1"})
+    with pytest.raises(AuthUnavailable):
+        verify(verifier, token)
+    up[0] = True
+    assert verify(verifier, token) == "user-123"
+
+
+def test_auth_outage_is_503_not_401(client, app_module, monkeypatch):
+    async def unavailable(token):
+        raise AuthUnavailable("auth server unreachable")
+
+    monkeypatch.setattr(app_module.token_verifier, "verify", unavailable)
+    resp = client.get("/pantry/list", headers={"Authorization": "Bearer anything"})
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == "5"
+
+
+def test_warns_when_hs_tokens_cannot_be_verified():
+    async def remote(t):
+        return None
+
+    assert TokenVerifier().warnings()
+    assert TokenVerifier(secret=SECRET).warnings() == []
+    assert TokenVerifier(remote_lookup=remote).warnings() == []
+
+
+def test_jwks_fetched_without_openrouter_credentials(app_module):
+    async def scenario():
+        async with app_module.lifespan(app_module.app):
+            jwks_http = app_module.token_verifier.jwks.http
+            return jwks_http is app_module.http_client, dict(jwks_http.headers)
+
+    shared, headers = asyncio.run(scenario())
+    assert not shared
+    assert "authorization" not in {name.lower() for name in headers}
@@ -0,0 +1,253 @@
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from llm import (
+    CircuitBreaker,
+    CircuitOpen,
+    ConcurrencyLimiter,
+    LLMClient,
+    Overloaded,
+    RateLimited,
+    UpstreamError,
+    UpstreamTimeout,
+    parse_retry_after,
+)
+
+OK = {"status": 200, "body": {"choices": [{"message": {"content": "### Recipe: Omelette"}}]}}
+
+
+class FakeProvider(ThreadingHTTPServer):
+    """Local HTTP server answering /chat/completions from a script of responses (the last one repeats)."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeHandler)
+        self.script = [OK]
+        self.requests = []
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def handle_error(self, request, client_address):
+        pass  # clients hanging up on a delayed response (timeouts) are expected
+
+    def next_response(self):
+        return self.script.pop(0) if len(self.script) > 1 else self.script[0]
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append(body)
+        spec = self.server.next_response()
+        time.sleep(spec.get("delay", 0))
+        chunks = spec.get("chunks")
+        payload = b"" if chunks else json.dumps(spec.get("body", {})).encode()
+        self.send_response(spec["status"])
+        for name, value in spec.get("headers", {}).items():
+            self.send_header(name, value)
+        if chunks:
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for chunk in chunks:
+                self.wfile.write(chunk.encode())
+                self.wfile.flush()
+                time.sleep(spec.get("chunk_delay", 0))
+            self.close_connection = True
+            return
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+@pytest.fixture
+def provider():
+    server = FakeProvider()
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class Sleeps(list):
+    async def __call__(self, delay):
+        self.append(delay)
+
+
+def run_client(provider, scenario, **options):
+    async def main():
+        async with httpx.AsyncClient(base_url=provider.url) as http:
+            options.setdefault("sleep", Sleeps())
+            options.setdefault("jitter", lambda: 1.0)
+            return await scenario(LLMClient(http, **options))
+
+    return asyncio.run(main())
+
+
+def complete(client, user_id=None):
+    return client.complete({"messages": []}, user_id=user_id)
+
+
+def test_success(provider):
+    assert run_client(provider, complete) == OK["body"]
+    assert provider.requests == [{"messages": []}]
+
+
+def test_retries_5xx_with_exponential_backoff_then_gives_up(provider):
+    provider.script = [{"status": 502, "body": "bad gateway"}]
+    sleeps = Sleeps()
+    with pytest.raises(UpstreamError) as exc:
+        run_client(provider, complete, max_retries=3, backoff_base=0.5, backoff_max=1.5, sleep=sleeps)
+    assert exc.value.status == 502 and exc.value.status_code == 502
+    assert sleeps == [0.5, 1.0, 1.5]
+    assert len(provider.requests) == 4
+
+
+def test_backoff_is_jittered(provider):
+    client = LLMClient(backoff_base=1, backoff_max=30, jitter=lambda: 0.25)
+    assert [client.backoff(attempt) for attempt in range(3)] == [0.25, 0.5, 1.0]
+
+
+def test_429_honours_retry_after(provider):
+    provider.script = [{"status": 429, "headers": {"Retry-After": "3"}}, {"status": 503}, OK]
+    sleeps = Sleeps()
+    assert run_client(provider, complete, backoff_base=0.5, sleep=sleeps) == OK["body"]
+    assert sleeps == [3.0, 1.0]
+
+
+def test_long_retry_after_is_not_waited_out(provider):
+    provider.script = [{"status": 429, "headers": {"Retry-After": "90"}}, OK]
+    with pytest.raises(RateLimited) as exc:
+        run_client(provider, complete, retry_after_max=10)
+    assert exc.value.retry_after == 90 and exc.value.status_code == 503
+    assert len(provider.requests) == 1
+
+
+def test_client_errors_are_not_retried(provider):
+    provider.script = [{"status": 400, "body": {"error": "bad model"}}, OK]
+    with pytest.raises(UpstreamError) as exc:
+        run_client(provider, complete)
+    assert exc.value.status == 400 and "bad model" in str(exc.value)
+    assert len(provider.requests) == 1
+
+
+def test_read_timeout(provider):
+    provider.script = [{**OK, "delay": 0.5}]
+    with pytest.raises(UpstreamTimeout):
+        run_client(provider, complete, timeout=httpx.Timeout(0.1, connect=1), max_retries=1)
+    assert len(provider.requests) == 2
+
+
+def test_connection_refused(provider):
+    closed = FakeProvider()
+    closed.server_close()
+    with pytest.raises(UpstreamError):
+        run_client(closed, complete, max_retries=0)
+
+
+def test_circuit_breaker_opens_fails_fast_and_recovers(provider):
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=lambda: now[0])
+    provider.script = [{"status": 500}, {"status": 500}, {"status": 500}, OK]
+
+    async def scenario(client):
+        with pytest.raises(UpstreamError):
+            await complete(client)
+        assert breaker.state == "open"
+        with pytest.raises(CircuitOpen) as exc:
+            await complete(client)
+        assert exc.value.retry_after == 30
+        sent = len(provider.requests)
+
+        now[0] += 31  # half-open: one probe goes through and closes the breaker
+        assert breaker.state == "half_open"
+        result = await complete(client)
+        return sent, result
+
+    sent, result = run_client(provider, scenario, max_retries=2, breaker=breaker)
+    assert sent == 3 and result == OK["body"]
+    assert breaker.state == "closed"
+
+
+def test_failed_probe_reopens_breaker():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure()
+    now[0] = 11
+    breaker.before_attempt()
+    with pytest.raises(CircuitOpen):
+        breaker.before_attempt()  # only one probe at a time
+    breaker.record_failure()
+    now[0] = 15
+    assert breaker.state == "open"
+
+
+def test_per_user_and_global_concurrency_limits(provider):
+    provider.script = [{**OK, "delay": 0.3}]
+    limiter = ConcurrencyLimiter(max_concurrency=2, per_user=1, queue_timeout=0.05)
+
+    async def scenario(client):
+        first = asyncio.ensure_future(complete(client, "alice"))
+        await asyncio.sleep(0.05)
+        with pytest.raises(Overloaded) as per_user:
+            await complete(client, "alice")
+        second = asyncio.ensure_future(complete(client, "bob"))
+        await asyncio.sleep(0.05)
+        with pytest.raises(Overloaded) as global_cap:
+            await complete(client, "carol")
+        await asyncio.gather(first, second)
+        return per_user.value.status_code, global_cap.value.status_code
+
+    assert run_client(provider, scenario, limiter=limiter) == (429, 503)
+    assert limiter.in_flight == 0 and limiter._users == {}
+    assert len(provider.requests) == 2
+
+
+def test_stream_retries_before_first_byte(provider):
+    deltas = ["### Recipe: A", "\nx"]
+    chunks = ["data: " + json.dumps({"choices": [{"delta": {"content": d}}]}) + "\n\n" for d in deltas]
+    provider.script = [{"status": 503}, {"status": 200, "chunks": chunks + ["data: [DONE]\n\n"]}]
+
+    async def scenario(client):
+        async with client.stream({"stream": True}) as response:
+            return [line async for line in response.aiter_lines() if line]
+
+    lines = run_client(provider, scenario)
+    assert lines[0].startswith("data: ") and lines[-1] == "data: [DONE]"
+    assert len(provider.requests) == 2
+
+
+def test_stalled_stream_times_out(provider):
+    provider.script = [{"status": 200, "chunks": ["data: {}\n\n", "data: {}\n\n"], "chunk_delay": 0.5}]
+
+    async def scenario(client):
+        async with client.stream({"stream": True}) as response:
+            async for _ in response.aiter_lines():
+                pass
+
+    with pytest.raises(UpstreamTimeout):
+        run_client(provider, scenario, timeout=httpx.Timeout(0.1, connect=1))
+
+
+def test_parse_retry_after():
+    now = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    assert parse_retry_after("7") == 7.0
+    assert parse_retry_after(format_datetime(now + timedelta(seconds=20), usegmt=True), now=now) == 20.0
+    assert parse_retry_after(format_datetime(now - timedelta(seconds=20), usegmt=True), now=now) == 0.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
@@ -0,0 +1,85 @@
+import asyncio
+
+import httpx
+import pytest
+
+from conftest import chat_completion
+from metrics import Histogram, server_timing, span
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("work_seconds", "Work.", ("kind",), buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(value, "a")
+
+    assert histogram.render() == [
+        "# HELP work_seconds Work.",
+        "# TYPE work_seconds histogram",
+        'work_seconds_bucket{kind="a",le="0.1"} 2',
+        'work_seconds_bucket{kind="a",le="1"} 3',
+        'work_seconds_bucket{kind="a",le="+Inf"} 4',
+        'work_seconds_sum{kind="a"} 3.65',
+        'work_seconds_count{kind="a"} 4',
+    ]
+
+
+def test_server_timing_sums_repeated_spans():
+    value = server_timing([("auth", 0.001), ("supabase.update", 0.002), ("supabase.update", 0.003)], 0.01)
+    assert value == "auth;dur=1.0, supabase.update;dur=5.0, total;dur=10.0"
+
+
+def test_span_works_outside_requests():
+    async def timed():
+        async with span("outside"):
+            pass
+        with span("outside"):
+            pass
+
+    asyncio.run(timed())
+
+
+def timings(resp):
+    return dict(entry.split(";dur=") for entry in resp.headers["Server-Timing"].split(", "))
+
+
+def test_server_timing_header_per_request(client, db, llm, auth_headers):
+    db.seed("user-1", {"item": "eggs", "quantity": 2})
+    llm.handler = lambda request: httpx.Response(200, json=chat_completion("### Recipe: Omelette"))
+
+    listed = timings(client.get("/pantry/list", headers=auth_headers))
+    assert {"auth", "supabase.select", "total"} <= set(listed)
+
+    recipes = timings(client.get("/api/recipes", headers=auth_headers))
+    assert {"auth", "openrouter", "total"} <= set(recipes)
+    assert "supabase.select" not in recipes  # pantry served from the cache
+
+    assert "Server-Timing" in client.get("/pantry/list", headers={"Authorization": "Bearer nope"}).headers
+
+
+def test_metrics_endpoint(client, db, auth_headers, metrics_headers):
+    [eggs] = db.seed("user-1", {"item": "eggs", "quantity": 2})
+    client.get("/pantry/list", headers=auth_headers)
+    client.patch(f"/pantry/update/{eggs['id']}", json={"quantity": 3}, headers=auth_headers)
+
+    resp = client.get("/metrics", headers=metrics_headers)
+    assert resp.headers["content-type"].startswith("text/plain")
+    text = resp.text
+    # Labelled by route template, not by the concrete path.
+    assert 'http_request_duration_seconds_count{method="PATCH",route="/pantry/update/{item_id}",status="200"}' in text
+    assert 'app_span_duration_seconds_bucket{span="supabase.update",le="+Inf"}' in text
+    assert 'app_span_duration_seconds_count{span="auth"}' in text
+    assert 'recipe_cache_events_total{event="hits"} 0' in text
+    assert 'pantry_cache_events_total{event="misses"} 1' in text
+    assert "llm_circuit_open 0" in text
+    assert "llm_consecutive_failures 0" in text
+    assert "llm_max_concurrency " in text
+
+
+@pytest.mark.parametrize("path", ["/metrics", "/api/recipes/cache"])
+def test_ops_endpoints_require_metrics_token(client, app_module, auth_headers, metrics_headers, monkeypatch, path):
+    assert client.get(path).status_code == 401
+    assert client.get(path, headers=auth_headers).status_code == 401  # a user's JWT is not enough
+    assert client.get(path, headers=metrics_headers).status_code == 200
+
+    monkeypatch.setattr(app_module, "METRICS_TOKEN", None)
+    assert client.get(path, headers=metrics_headers).status_code == 404
@@ -1,38 +1,53 @@
-from fastapi.testclient import TestClient
-from main import app  # adjust if your FastAPI app is in another file
+def test_add_pantry_item(client, db, auth_headers):
+    response = client.post("/pantry/add", json={"item": "tomato", "quantity": 2, "unit": "pcs"}, headers=auth_headers)
+    assert response.status_code == 201
+    [row] = response.json()
+    assert row["item"] == "tomato" and row["user_id"] == "user-1"
+    assert db.tables["pantry"] == [row]
 
-client = TestClient(app)
 
-def test_add_pantry_item():
-    response = client.post(
-        "/pantry/add",
-        json={"item_name": "tomato", "quantity": 2, "unit": "pcs"}
-    )
-    assert response.status_code == 201
-    data = response.json()
-    assert isinstance(data, list)
-    assert "id" in data[0]
-    assert data[0]["item_name"] == "tomato"
+def test_add_requires_auth(client, db):
+    assert client.post("/pantry/add", json={"item": "tomato", "quantity": 2}).status_code == 422
+    assert client.post(
+        "/pantry/add", json={"item": "tomato", "quantity": 2}, headers={"Authorization": "Bearer nope"}
+    ).status_code == 401
+    assert db.tables.get("pantry", []) == []
+
+
+def test_add_validates_body(client, auth_headers):
+    # The old client sent item_name; the API expects item.
+    assert client.post("/pantry/add", json={"item_name": "tomato", "quantity": 2}, headers=auth_headers).status_code == 422
+
+
+def test_list_pantry_items(client, db, auth_headers):
+    db.seed("user-1", {"item": "eggs", "quantity": 12})
+    db.seed("user-2", {"item": "caviar", "quantity": 1})
+    response = client.get("/pantry/list", headers=auth_headers)
+    assert response.status_code == 200
+    assert [row["item"] for row in response.json()] == ["eggs"]
 
-def test_list_pantry_items():
-    response = client.get("/pantry/list")
+
+def test_update_pantry_item(client, db, auth_headers):
+    [eggs] = db.seed("user-1", {"item": "eggs", "quantity": 12})
+    response = client.patch(f"/pantry/update/{eggs['id']}", json={"quantity": 6}, headers=auth_headers)
     assert response.status_code == 200
-    data = response.json()
-    assert isinstance(data, list)
-
-def test_remove_pantry_item():
-    # Add an item first
-    add_response = client.post(
-        "/pantry/add",
-        json={"item_name": "lettuce", "quantity": 1, "unit": "head"}
-    )
-    assert add_response.status_code in (200, 201)
-    data = add_response.json()
-    assert isinstance(data, list)
-    assert "id" in data[0]
-
-    item_id = data[0]["id"]
-    remove_response = client.delete(f"/pantry/remove/{item_id}")
-    assert remove_response.status_code == 200
-    detail = remove_response.json().get("detail")
-    assert detail == "Item deleted successfully"
+    assert response.json()["item"]["quantity"] == 6
+    assert client.patch("/pantry/update/999", json={"quantity": 6}, headers=auth_headers).status_code == 404
+
+
+def test_remove_pantry_item(client, db, auth_headers):
+    added = client.post("/pantry/add", json={"item": "lettuce", "quantity": 1, "unit": "head"}, headers=auth_headers)
+    item_id = added.json()[0]["id"]
+
+    response = client.delete(f"/pantry/remove/{item_id}", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["detail"] == "Item deleted successfully"
+    assert client.get("/pantry/list", headers=auth_headers).json() == []
+    assert client.delete(f"/pantry/remove/{item_id}", headers=auth_headers).status_code == 404
+
+
+def test_cannot_touch_another_users_item(client, db, auth_headers):
+    [caviar] = db.seed("user-2", {"item": "caviar", "quantity": 1})
+    assert client.delete(f"/pantry/remove/{caviar['id']}", headers=auth_headers).status_code == 404
+    assert client.patch(f"/pantry/update/{caviar['id']}", json={"quantity": 0}, headers=auth_headers).status_code == 404
+    assert db.tables["pantry"] == [caviar]
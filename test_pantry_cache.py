@@ -0,0 +1,267 @@
+import asyncio
+
+import pytest
+
+from pantry_cache import MemoryPantryBackend, PantryCache, RedisPantryBackend, WatchError
+
+
+class FakeRedis:
+    """In-memory stand-in for the redis.asyncio commands RedisPantryBackend uses."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.hashes = {}
+        self.strings = {}
+        self.expiry = {}
+
+    def _expire_old(self, key):
+        if key in self.expiry and self.expiry[key] <= self.clock():
+            self.hashes.pop(key, None)
+            self.strings.pop(key, None)
+            self.expiry.pop(key, None)
+
+    async def get(self, key):
+        self._expire_old(key)
+        return self.strings.get(key)
+
+    async def incr(self, key):
+        self._expire_old(key)
+        self.strings[key] = str(int(self.strings.get(key, 0)) + 1)
+        return int(self.strings[key])
+
+    async def hgetall(self, key):
+        self._expire_old(key)
+        return dict(self.hashes.get(key, {}))
+
+    async def hexists(self, key, field):
+        self._expire_old(key)
+        return field in self.hashes.get(key, {})
+
+    async def hset(self, key, mapping):
+        self._expire_old(key)
+        self.hashes.setdefault(key, {}).update(mapping)
+
+    async def hdel(self, key, *fields):
+        self._expire_old(key)
+        for field in fields:
+            self.hashes.get(key, {}).pop(field, None)
+
+    async def delete(self, key):
+        self.hashes.pop(key, None)
+        self.strings.pop(key, None)
+        self.expiry.pop(key, None)
+
+    async def expire(self, key, seconds, nx=False):
+        if (key in self.hashes or key in self.strings) and not (nx and key in self.expiry):
+            self.expiry[key] = self.clock() + seconds
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    """Queues commands for execute(); after watch(), reads run at once until multi()."""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+        self.watched = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def watch(self, *keys):
+        self.watched = {key: await self.redis.get(key) for key in keys}
+
+    async def get(self, key):
+        return await self.redis.get(key)
+
+    def multi(self):
+        pass
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self):
+        calls, self.calls = self.calls, []
+        watched, self.watched = self.watched, {}
+        for key, value in watched.items():
+            if await self.redis.get(key) != value:
+                raise WatchError(key)
+        return [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in calls]
+
+
+@pytest.fixture(params=["memory", "redis"])
+def clock_and_backend(request):
+    now = [1000.0]
+    clock = lambda: now[0]
+    if request.param == "memory":
+        backend = MemoryPantryBackend(max_users=2, ttl=60, clock=clock)
+    else:
+        backend = RedisPantryBackend(FakeRedis(clock), ttl=60)
+    return now, backend
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_backend_roundtrip_and_write_through(clock_and_backend):
+    now, backend = clock_and_backend
+    assert run(backend.get("u")) is None
+    run(backend.set("u", []))
+    assert run(backend.get("u")) == []  # an empty pantry is a hit, not a miss
+
+    run(backend.set("u", [{"id": 1, "item": "eggs", "quantity": 2}]))
+    run(backend.upsert_rows("u", [{"id": 1, "item": "eggs", "quantity": 5}, {"id": 2, "item": "milk", "quantity": 1}]))
+    run(backend.delete_rows("u", [2]))
+    assert run(backend.get("u")) == [{"id": 1, "item": "eggs", "quantity": 5}]
+
+    now[0] += 61
+    assert run(backend.get("u")) is None
+
+
+def test_write_through_does_not_create_partial_entries(clock_and_backend):
+    _, backend = clock_and_backend
+    run(backend.upsert_rows("u", [{"id": 1, "item": "eggs", "quantity": 2}]))
+    assert run(backend.get("u")) is None
+
+
+def test_memory_backend_evicts_least_recent_user():
+    backend = MemoryPantryBackend(max_users=2)
+    for user in ("a", "b"):
+        run(backend.set(user, []))
+    run(backend.get("a"))
+    run(backend.set("c", []))
+    assert run(backend.get("b")) is None
+    assert run(backend.get("a")) == [] and run(backend.get("c")) == []
+
+
+def test_redis_backend_shared_between_workers():
+    redis = FakeRedis(clock=lambda: 0.0)
+    worker_a = PantryCache(RedisPantryBackend(redis))
+    worker_b = PantryCache(RedisPantryBackend(redis))
+
+    async def load(user_id):
+        return [{"id": 1, "item": "eggs", "quantity": 2}]
+
+    async def scenario():
+        await worker_a.rows("u", load)
+        await worker_b.written("u", [{"id": 1, "item": "eggs", "quantity": 7}])
+        return await worker_a.rows("u", load)
+
+    assert run(scenario()) == [{"id": 1, "item": "eggs", "quantity": 7}]
+    assert worker_a.stats == {"hits": 1, "misses": 1}
+
+
+def test_write_on_another_worker_during_load_is_not_cached_stale():
+    redis = FakeRedis(clock=lambda: 0.0)
+    worker_a = PantryCache(RedisPantryBackend(redis))
+    worker_b = PantryCache(RedisPantryBackend(redis))
+    release = None
+
+    async def slow_load(user_id):
+        await release.wait()
+        return [{"id": 1, "item": "eggs", "quantity": 2}]  # snapshot from before the write
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        reader = asyncio.ensure_future(worker_a.rows("u", slow_load))
+        await asyncio.sleep(0)
+        await worker_b.written("u", [{"id": 1, "item": "eggs", "quantity": 9}])
+        release.set()
+        await reader
+        return await worker_a.backend.get("u")
+
+    assert run(scenario()) is None
+
+
+def test_redis_set_is_skipped_when_a_write_lands_while_storing():
+    redis = FakeRedis(clock=lambda: 0.0)
+    backend = RedisPantryBackend(redis)
+    original_get, gets = redis.get, []
+
+    async def get_then_write(key):
+        value = await original_get(key)
+        gets.append(key)
+        if len(gets) == 2:  # WATCH snapshot, then the version check: another worker writes before EXEC
+            await RedisPantryBackend(redis).delete_rows("u", [1])
+        return value
+
+    async def scenario():
+        version = await backend.version("u")
+        redis.get = get_then_write
+        await backend.set("u", [{"id": 1, "item": "eggs", "quantity": 2}], version)
+        redis.get = original_get
+        return await backend.get("u")
+
+    assert run(scenario()) is None
+
+
+def test_write_during_load_is_not_cached_stale():
+    cache = PantryCache(MemoryPantryBackend())
+    release = None
+
+    async def slow_load(user_id):
+        await release.wait()
+        return [{"id": 1, "item": "eggs", "quantity": 2}]  # snapshot from before the write
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        reader = asyncio.ensure_future(cache.rows("u", slow_load))
+        await asyncio.sleep(0)
+        await cache.written("u", [{"id": 1, "item": "eggs", "quantity": 9}])
+        release.set()
+        await reader
+        return await cache.backend.get("u")
+
+    assert run(scenario()) is None
+
+
+# Routes
+
+def select_count(db):
+    return db.queries.count(("pantry", "select"))
+
+
+def test_list_and_recipes_share_cached_pantry(client, db, auth_headers):
+    db.seed("user-1", {"item": "eggs", "quantity": 2})
+
+    client.get("/pantry/list", headers=auth_headers)
+    client.get("/pantry/list", params={"limit": 1}, headers=auth_headers)
+    client.get("/api/recipes", headers=auth_headers)
+
+    assert select_count(db) == 1
+
+
+def test_writes_go_through_the_cache(client, db, auth_headers):
+    [eggs] = db.seed("user-1", {"item": "eggs", "quantity": 2})
+    client.get("/pantry/list", headers=auth_headers)
+
+    added = client.post("/pantry/add", json={"item": "milk", "quantity": 1}, headers=auth_headers).json()[0]
+    client.patch(f"/pantry/update/{eggs['id']}", json={"quantity": 6}, headers=auth_headers)
+    client.post("/pantry/batch/add", json=[{"item": "rice", "quantity": 1}], headers=auth_headers)
+    client.post("/pantry/batch/remove", json=[added["id"]], headers=auth_headers)
+
+    listed = client.get("/pantry/list", headers=auth_headers).json()
+    assert sorted((row["item"], row["quantity"]) for row in listed) == [("eggs", 6), ("rice", 1)]
+    assert select_count(db) == 1
+
+
+def test_cache_is_per_user(client, db, auth_headers):
+    from conftest import make_token
+
+    db.seed("user-1", {"item": "eggs", "quantity": 2})
+    db.seed("user-2", {"item": "milk", "quantity": 1})
+    other = {"Authorization": f"Bearer {make_token('user-2')}"}
+
+    assert [row["item"] for row in client.get("/pantry/list", headers=auth_headers).json()] == ["eggs"]
+    assert [row["item"] for row in client.get("/pantry/list", headers=other).json()] == ["milk"]
@@ -0,0 +1,142 @@
+import pytest
+
+ITEMS = [
+    {"item": "eggs", "quantity": 12, "unit": ""},
+    {"item": "Egg noodles", "quantity": 1, "unit": "bag"},
+    {"item": "milk", "quantity": 2, "unit": "l"},
+    {"item": "rice", "quantity": 2, "unit": "kg"},
+    {"item": 'odd, "quoted" (item)', "quantity": 2, "unit": "kg"},
+    {"item": "apples", "quantity": 6, "unit": ""},
+]
+
+
+@pytest.fixture(params=["cached", "uncached"])
+def pantry(request, client, db, app_module, monkeypatch):
+    # Both list paths (cached pantry vs. PostgREST query) must return the same pages.
+    if request.param == "uncached":
+        monkeypatch.setattr(app_module, "pantry_cache", None)
+    db.seed("someone-else", {"item": "caviar", "quantity": 1})
+    return db.seed("user-1", *ITEMS)
+
+
+def db_order(value):
+    # NULLs last, text case-insensitively: the order both list paths must produce.
+    return (value is None, (value.casefold(), value) if isinstance(value, str) else value)
+
+
+def paginate(client, headers, **params):
+    pages, cursor = [], None
+    while True:
+        query = dict(params, **({"cursor": cursor} if cursor else {}))
+        resp = client.get("/pantry/list", params=query, headers=headers)
+        assert resp.status_code == 200
+        pages.append(resp.json())
+        cursor = resp.headers.get("X-Next-Cursor")
+        if not cursor:
+            return pages
+
+
+def test_unparameterised_list_returns_whole_pantry(client, pantry, auth_headers):
+    resp = client.get("/pantry/list", headers=auth_headers)
+    assert [row["id"] for row in resp.json()] == [row["id"] for row in pantry]
+    assert "X-Next-Cursor" not in resp.headers
+
+
+def test_keyset_pagination_by_id(client, pantry, auth_headers):
+    pages = paginate(client, auth_headers, limit=4)
+    assert [len(page) for page in pages] == [4, 2]
+    assert [row["id"] for page in pages for row in page] == [row["id"] for row in pantry]
+
+
+@pytest.mark.parametrize("sort", ["item", "unit", "quantity"])
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_keyset_pagination_with_sort_and_ties(client, pantry, auth_headers, sort, order):
+    pages = paginate(client, auth_headers, limit=2, sort=sort, order=order)
+    flat = [row for page in pages for row in page]
+    expected = sorted(pantry, key=lambda row: (db_order(row[sort]), row["id"]), reverse=order == "desc")
+    assert [row["id"] for row in flat] == [row["id"] for row in expected]
+
+
+def test_text_sorts_case_insensitively(client, pantry, auth_headers):
+    resp = client.get("/pantry/list", params={"sort": "item", "fields": "item"}, headers=auth_headers)
+    assert [row["item"] for row in resp.json()][:3] == ["apples", "Egg noodles", "eggs"]
+
+
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_keyset_pagination_over_null_values(client, db, pantry, auth_headers, order):
+    nulls = db.seed("user-1", {"item": "salt", "quantity": None, "unit": None}, {"item": "sugar", "quantity": 1, "unit": None})
+    rows = pantry + nulls
+    for sort in ("unit", "quantity"):
+        pages = paginate(client, auth_headers, limit=2, sort=sort, order=order)
+        expected = sorted(rows, key=lambda row: (db_order(row[sort]), row["id"]), reverse=order == "desc")
+        assert [row["id"] for page in pages for row in page] == [row["id"] for row in expected]
+
+    assert client.get("/pantry/list", params={"min_quantity": 1}, headers=auth_headers).status_code == 200
+
+
+def test_filters(client, pantry, auth_headers):
+    def names(**params):
+        return sorted(row["item"] for row in client.get("/pantry/list", params=params, headers=auth_headers).json())
+
+    assert names(item="egg") == ["Egg noodles", "eggs"]
+    assert names(unit="kg") == ['odd, "quoted" (item)', "rice"]
+    assert names(min_quantity=2, max_quantity=6) == ["apples", "milk", 'odd, "quoted" (item)', "rice"]
+    assert names(item="caviar") == []
+    # ilike wildcards behave the same on both paths; a backslash makes them literal.
+    assert names(item="e_g") == ["Egg noodles", "eggs"]
+    assert names(item="m%k") == ["milk"]
+    assert names(item="\\_") == []
+
+
+def test_projection(client, pantry, auth_headers):
+    resp = client.get("/pantry/list", params={"fields": "item", "sort": "quantity", "limit": 2}, headers=auth_headers)
+    assert resp.json() == [{"item": "Egg noodles"}, {"item": "milk"}]
+    assert resp.headers["X-Next-Cursor"]
+
+    assert client.get("/pantry/list", params={"fields": "item,user_id"}, headers=auth_headers).status_code == 400
+
+
+def test_invalid_params(client, pantry, auth_headers):
+    assert client.get("/pantry/list", params={"cursor": "!!"}, headers=auth_headers).status_code == 400
+
+
+def test_cursor_must_match_sort_order_and_type(client, pantry, auth_headers, app_module):
+    def status(cursor, **params):
+        return client.get("/pantry/list", params={"cursor": cursor, "limit": 2, **params}, headers=auth_headers).status_code
+
+    by_item = client.get("/pantry/list", params={"sort": "item", "limit": 2}, headers=auth_headers).headers["X-Next-Cursor"]
+    assert status(by_item, sort="item") == 200
+    assert status(by_item, sort="quantity") == 400
+    assert status(by_item, sort="item", order="desc") == 400
+    assert status(by_item) == 400
+
+    forged = app_module.encode_cursor({"id": pantry[0]["id"], "quantity": "eggs"}, "quantity", "asc")
+    assert status(forged, sort="quantity") == 400
+    forged = app_module.encode_cursor({"id": "1", "item": "eggs"}, "item", "asc")
+    assert status(forged, sort="item") == 400
+    assert client.get("/pantry/list", params={"limit": 0}, headers=auth_headers).status_code == 422
+    assert client.get("/pantry/list", params={"sort": "user_id"}, headers=auth_headers).status_code == 422
+
+
+def test_etag_not_modified_until_pantry_changes(client, db, pantry, auth_headers):
+    first = client.get("/pantry/list", headers=auth_headers)
+    etag = first.headers["ETag"]
+    assert etag.startswith('W/"')
+
+    cached = client.get("/pantry/list", headers={**auth_headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["ETag"] == etag
+
+    client.patch(f"/pantry/update/{pantry[0]['id']}", json={"quantity": 11}, headers=auth_headers)
+    changed = client.get("/pantry/list", headers={**auth_headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_etag_differs_per_page_and_projection(client, pantry, auth_headers):
+    tags = {
+        client.get("/pantry/list", params=params, headers=auth_headers).headers["ETag"]
+        for params in ({}, {"limit": 2}, {"fields": "item"})
+    }
+    assert len(tags) == 3
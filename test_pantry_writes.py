@@ -0,0 +1,155 @@
+import asyncio
+
+import httpx
+
+
+def pantry_rows(db, user_id="user-1"):
+    return sorted((row["item"], row["quantity"]) for row in db.tables["pantry"] if row["user_id"] == user_id)
+
+
+def test_update_is_one_statement(client, db, auth_headers):
+    [row] = db.seed("user-1", {"item": "eggs", "quantity": 2})
+
+    resp = client.patch(f"/pantry/update/{row['id']}", json={"quantity": 6}, headers=auth_headers)
+
+    assert resp.status_code == 200
+    assert resp.json()["item"]["quantity"] == 6
+    assert db.queries == [("pantry", "update")]
+
+
+def test_update_and_remove_other_users_item_is_404(client, db, auth_headers):
+    [row] = db.seed("someone-else", {"item": "eggs", "quantity": 2})
+
+    assert client.patch(f"/pantry/update/{row['id']}", json={"quantity": 6}, headers=auth_headers).status_code == 404
+    assert client.delete(f"/pantry/remove/{row['id']}", headers=auth_headers).status_code == 404
+    assert pantry_rows(db, "someone-else") == [("eggs", 2)]
+    assert db.queries == [("pantry", "update"), ("pantry", "delete")]
+
+
+def test_remove_is_one_statement(client, db, auth_headers):
+    [row] = db.seed("user-1", {"item": "eggs", "quantity": 2})
+
+    resp = client.delete(f"/pantry/remove/{row['id']}", headers=auth_headers)
+
+    assert resp.json() == {"detail": "Item deleted successfully"}
+    assert db.queries == [("pantry", "delete")]
+    assert pantry_rows(db) == []
+
+
+def test_batch_add_single_insert(client, db, auth_headers):
+    haul = [{"item": "eggs", "quantity": 12}, {"item": "milk", "quantity": 1, "unit": "l"}, {"item": "rice", "quantity": 2}]
+
+    resp = client.post("/pantry/batch/add", json=haul, headers=auth_headers)
+
+    assert resp.status_code == 201
+    results = resp.json()["results"]
+    assert [r["status"] for r in results] == ["created"] * 3
+    assert [r["item"]["item"] for r in results] == ["eggs", "milk", "rice"]
+    assert all(r["item"]["user_id"] == "user-1" for r in results)
+    assert db.queries == [("pantry", "insert")]
+
+
+def test_batch_add_validates_every_item(client, db, auth_headers):
+    resp = client.post("/pantry/batch/add", json=[{"item": "eggs", "quantity": 1}, {"item": "milk"}], headers=auth_headers)
+    assert resp.status_code == 422
+    assert db.queries == []
+
+
+def test_batch_update_groups_by_quantity(client, db, auth_headers):
+    eggs, milk, rice = db.seed("user-1", {"item": "eggs", "quantity": 1}, {"item": "milk", "quantity": 1}, {"item": "rice", "quantity": 1})
+    [foreign] = db.seed("someone-else", {"item": "caviar", "quantity": 1})
+
+    resp = client.patch("/pantry/batch/update", headers=auth_headers, json=[
+        {"id": eggs["id"], "quantity": 5},
+        {"id": milk["id"], "quantity": 5},
+        {"id": rice["id"], "quantity": 0},
+        {"id": foreign["id"], "quantity": 9},
+        {"id": 999, "quantity": 5},
+    ])
+
+    assert [(r["id"], r["status"]) for r in resp.json()["results"]] == [
+        (eggs["id"], "updated"), (milk["id"], "updated"), (rice["id"], "updated"),
+        (foreign["id"], "not_found"), (999, "not_found"),
+    ]
+    assert pantry_rows(db) == [("eggs", 5), ("milk", 5), ("rice", 0)]
+    assert pantry_rows(db, "someone-else") == [("caviar", 1)]
+    assert db.queries == [("pantry", "update")] * 3
+
+
+def test_batch_remove_single_delete(client, db, auth_headers):
+    eggs, milk = db.seed("user-1", {"item": "eggs", "quantity": 1}, {"item": "milk", "quantity": 1})
+    [foreign] = db.seed("someone-else", {"item": "caviar", "quantity": 1})
+
+    resp = client.post("/pantry/batch/remove", json=[eggs["id"], foreign["id"], eggs["id"]], headers=auth_headers)
+
+    assert resp.json()["results"] == [
+        {"id": eggs["id"], "status": "deleted"},
+        {"id": foreign["id"], "status": "not_found"},
+    ]
+    assert pantry_rows(db) == [("milk", 1)]
+    assert pantry_rows(db, "someone-else") == [("caviar", 1)]
+    assert db.queries == [("pantry", "delete")]
+
+
+def test_batch_size_limits(client, db, auth_headers, app_module):
+    assert client.post("/pantry/batch/remove", json=[], headers=auth_headers).status_code == 422
+    too_many = list(range(app_module.MAX_BATCH_SIZE + 1))
+    assert client.post("/pantry/batch/remove", json=too_many, headers=auth_headers).status_code == 422
+    assert db.queries == []
+
+
+def test_batch_writes_invalidate_recipe_cache(client, db, app_module, auth_headers):
+    [row] = db.seed("user-1", {"item": "eggs", "quantity": 1})
+    app_module.recipe_cache.set("user-1", "key", "### Recipe: Omelette")
+
+    client.patch("/pantry/batch/update", json=[{"id": row["id"], "quantity": 3}], headers=auth_headers)
+
+    assert app_module.recipe_cache.get("user-1", "key") is None
+
+
+def test_batch_update_reports_failed_group_per_item(client, db, app_module, auth_headers, monkeypatch):
+    eggs, milk = db.seed("user-1", {"item": "eggs", "quantity": 1}, {"item": "milk", "quantity": 1})
+    client.get("/pantry/list", headers=auth_headers)  # warm the pantry cache
+    run_query = app_module.run_query
+
+    async def flaky(query, action):
+        if query.payload == {"quantity": 9}:
+            raise httpx.ReadTimeout("timed out")
+        return await run_query(query, action)
+
+    monkeypatch.setattr(app_module, "run_query", flaky)
+    resp = client.patch("/pantry/batch/update", headers=auth_headers, json=[
+        {"id": eggs["id"], "quantity": 5},
+        {"id": milk["id"], "quantity": 9},
+    ])
+
+    assert resp.status_code == 200
+    assert resp.json()["results"][0]["status"] == "updated"
+    assert resp.json()["results"][1] == {"id": milk["id"], "status": "error", "detail": "Update failed"}
+    # The failed group's outcome is unknown, so the next read goes back to Supabase.
+    db.queries.clear()
+    client.get("/pantry/list", headers=auth_headers)
+    assert db.queries == [("pantry", "select")]
+
+
+def test_batch_update_concurrency_is_bounded(client, db, app_module, auth_headers, monkeypatch):
+    rows = db.seed("user-1", *({"item": f"item {n}", "quantity": 0} for n in range(6)))
+    monkeypatch.setattr(app_module, "BATCH_UPDATE_CONCURRENCY", 2)
+    run_query, active, peak = app_module.run_query, [0], [0]
+
+    async def tracked(query, action):
+        active[0] += 1
+        peak[0] = max(peak[0], active[0])
+        await asyncio.sleep(0.01)
+        try:
+            return await run_query(query, action)
+        finally:
+            active[0] -= 1
+
+    monkeypatch.setattr(app_module, "run_query", tracked)
+    resp = client.patch("/pantry/batch/update", headers=auth_headers, json=[
+        {"id": row["id"], "quantity": n + 1} for n, row in enumerate(rows)
+    ])
+
+    assert [r["status"] for r in resp.json()["results"]] == ["updated"] * 6
+    assert peak[0] == 2
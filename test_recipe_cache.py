@@ -0,0 +1,166 @@
+import asyncio
+
+import pytest
+
+from recipe_cache import MemoryBackend, RecipeCache, SQLiteBackend, pantry_fingerprint
+
+ROWS = [
+    {"id": 1, "item": "Eggs", "quantity": 2, "unit": ""},
+    {"id": 2, "item": "milk", "quantity": 1, "unit": "cup"},
+]
+
+
+def test_fingerprint_ignores_row_order_ids_and_case():
+    shuffled = [
+        {"id": 9, "item": "milk ", "quantity": 1, "unit": "Cup"},
+        {"id": 7, "item": "eggs", "quantity": 2, "unit": None},
+    ]
+    assert pantry_fingerprint(ROWS, "m", 1) == pantry_fingerprint(shuffled, "m", 1)
+
+
+@pytest.mark.parametrize("rows, model, version", [
+    ([{**ROWS[0], "quantity": 3}, ROWS[1]], "m", 1),
+    (ROWS[:1], "m", 1),
+    (ROWS, "other-model", 1),
+    (ROWS, "m", 2),
+])
+def test_fingerprint_changes_with_contents_model_and_prompt(rows, model, version):
+    assert pantry_fingerprint(rows, model, version) != pantry_fingerprint(ROWS, "m", 1)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_backend(request, tmp_path):
+    def make(maxsize, ttl, clock):
+        if request.param == "memory":
+            return MemoryBackend(maxsize=maxsize, ttl=ttl, clock=clock)
+        return SQLiteBackend(str(tmp_path / "cache.sqlite3"), maxsize=maxsize, ttl=ttl, clock=clock)
+    return make
+
+
+def test_backend_lru_and_ttl(make_backend):
+    now = [100.0]
+    backend = make_backend(maxsize=2, ttl=60, clock=lambda: now[0])
+    backend.set("a", "recipe a")
+    now[0] += 1
+    backend.set("b", "recipe b")
+    now[0] += 1
+    assert backend.get("a") == "recipe a"  # a is now most recently used
+    now[0] += 1
+    backend.set("c", "recipe c")
+    assert backend.get("b") is None
+    assert len(backend) == 2
+    now[0] += 61
+    assert backend.get("a") is None
+    backend.delete("c")
+    assert backend.get("c") is None
+
+
+def test_sqlite_backend_writes_without_fsync_per_statement(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "cache.sqlite3"), maxsize=1)
+    assert backend._conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+    backend.set("a", "one")
+    backend.set("b", "two")
+    assert not backend._conn.in_transaction
+    assert (backend.get("a"), backend.get("b")) == (None, "two")
+
+
+def test_sqlite_backend_persists(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    SQLiteBackend(path).set("k", "### Recipe: Soup")
+    assert SQLiteBackend(path).get("k") == "### Recipe: Soup"
+
+
+def test_concurrent_misses_share_one_generation():
+    cache = RecipeCache(MemoryBackend())
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "### Recipe: Soup"
+
+    async def run():
+        results = await asyncio.gather(*(cache.get_or_generate("u", "k", generate) for _ in range(10)))
+        again = await cache.get_or_generate("u", "k", generate)
+        return results, again
+
+    results, again = asyncio.run(run())
+    assert results == ["### Recipe: Soup"] * 10
+    assert again == "### Recipe: Soup"
+    assert len(calls) == 1
+    assert cache.snapshot() == {
+        "hits": 1, "misses": 10, "coalesced": 9, "invalidations": 0, "inflight": 0, "size": 1, "hit_ratio": 0.0909,
+    }
+
+
+def test_failed_generation_is_not_cached():
+    cache = RecipeCache(MemoryBackend())
+
+    async def fail():
+        raise RuntimeError("upstream down")
+
+    async def ok():
+        return "### Recipe: Soup"
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(cache.get_or_generate("u", "k", fail))
+    assert asyncio.run(cache.get_or_generate("u", "k", ok)) == "### Recipe: Soup"
+
+
+def test_cancelled_caller_does_not_cancel_shared_generation():
+    cache = RecipeCache(MemoryBackend())
+
+    async def generate():
+        await asyncio.sleep(0.02)
+        return "### Recipe: Soup"
+
+    async def run():
+        first = asyncio.ensure_future(cache.get_or_generate("u", "k", generate))
+        second = asyncio.ensure_future(cache.get_or_generate("u", "k", generate))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == "### Recipe: Soup"
+    assert cache.get("u", "k") == "### Recipe: Soup"
+
+
+def test_invalidate_drops_users_entries():
+    cache = RecipeCache(MemoryBackend())
+    cache.set("u1", "k1", "one")
+    cache.set("u2", "k2", "two")
+    cache.invalidate("u1")
+    assert cache.get("u1", "k1") is None
+    assert cache.get("u2", "k2") == "two"
+    assert cache.stats["invalidations"] == 1
+
+
+def test_user_tracking_is_bounded_by_backend_size():
+    cache = RecipeCache(MemoryBackend(maxsize=2))
+    for n in range(1000):
+        cache.set(f"user-{n}", "k", "value")
+    assert len(cache.backend) == 2
+    assert len(cache._user_keys) == len(cache._owners) == 2
+    cache.invalidate("user-999")
+    assert cache.get("user-998", "k") == "value"
+    assert cache.get("user-999", "k") is None
+
+
+def test_same_pantry_for_two_users_is_invalidated_per_user():
+    cache = RecipeCache(MemoryBackend())
+    cache.set("u1", "same-pantry", "one")
+    cache.set("u2", "same-pantry", "two")
+    cache.invalidate("u1")
+    assert cache.get("u1", "same-pantry") is None
+    assert cache.get("u2", "same-pantry") == "two"
+
+
+def test_failed_generation_leaves_no_entry():
+    cache = RecipeCache(MemoryBackend())
+
+    async def empty():
+        raise ValueError("no recipes")
+
+    with pytest.raises(ValueError):
+        asyncio.run(cache.get_or_generate("u", "k", empty))
+    assert cache.get("u", "k") is None
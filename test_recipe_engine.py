@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+from recipe_engine import RecipeIndex, format_recipes, load_recipes, normalize_ingredient
+
+CORPUS = [
+    {"title": "Omelette", "ingredients": ["3 eggs", "1 tbsp butter", "salt"], "instructions": ["Whisk.", "Cook."]},
+    {"title": "Cheese Toast", "ingredients": ["2 slices bread", "50 g cheddar cheese"], "instructions": "Grill."},
+    {"title": "Egg Fried Rice", "ingredients": ["2 eggs", "rice", "soy sauce", "spring onions"], "instructions": "Fry."},
+    {"title": "Salt Water", "ingredients": ["salt", "water"], "instructions": "Stir."},
+]
+
+
+@pytest.mark.parametrize("raw, normalized", [
+    ("2 Fresh Tomatoes, diced", "tomato"),
+    ("400 g canned tomatoes", "tomato"),
+    ("Eggs", "egg"),
+    ("3 cloves garlic", "garlic"),
+    ("2 tbsp soy sauce", "soy sauce"),
+    ("berries", "berry"),
+    ("glass", "glass"),
+])
+def test_normalize_ingredient(raw, normalized):
+    assert normalize_ingredient(raw) == normalized
+
+
+def test_match_ranks_by_coverage():
+    index = RecipeIndex(CORPUS)
+    matches = index.match(["Eggs", "butter", "rice"], k=5)
+    assert [(m["recipe"]["title"], m["coverage"]) for m in matches] == [("Omelette", 1.0), ("Egg Fried Rice", 0.5)]
+    assert matches[1]["missing"] == ["soy sauce", "spring onions"]
+
+
+def test_staples_count_but_do_not_create_candidates():
+    index = RecipeIndex(CORPUS)
+    # Salt Water is all staples, so it never matches on its own.
+    assert index.match(["salt", "water"]) == []
+    assert index.match(["eggs", "butter"])[0]["missing"] == []
+
+
+def test_multi_word_pantry_items_cover_generic_ingredients():
+    index = RecipeIndex([{"title": "Toast", "ingredients": ["bread", "cheese"], "instructions": ""}])
+    assert index.match(["sourdough bread", "mature cheddar cheese"])[0]["coverage"] == 1.0
+    # ...but not the other way round.
+    index = RecipeIndex(CORPUS)
+    assert index.match(["cheese", "bread"])[0]["missing"] == ["50 g cheddar cheese"]
+
+
+def test_modifiers_do_not_cover_other_ingredients():
+    index = RecipeIndex(CORPUS)
+    # Only the head noun counts: egg noodles aren't eggs.
+    [omelette] = [m for m in index.match(["egg noodles", "peanut butter", "coconut milk"]) if m["recipe"]["title"] == "Omelette"]
+    assert omelette["coverage"] < 1.0
+    assert omelette["missing"] == ["3 eggs"]
+    assert index.match(["egg noodles"]) == []
+
+
+def test_top_k_and_min_coverage():
+    index = RecipeIndex(CORPUS)
+    assert len(index.match(["eggs"], k=1)) == 1
+    assert [m["recipe"]["title"] for m in index.match(["eggs"], min_coverage=0.6)] == ["Omelette"]
+
+
+def test_load_json_and_csv(tmp_path):
+    json_path = tmp_path / "recipes.json"
+    json_path.write_text(json.dumps(CORPUS))
+    csv_path = tmp_path / "recipes.csv"
+    csv_path.write_text('title,ingredients,instructions\nOmelette,"3 eggs; 1 tbsp butter; salt",Whisk and cook.\n')
+
+    assert load_recipes(json_path) == CORPUS
+    assert load_recipes(csv_path) == [
+        {"title": "Omelette", "ingredients": ["3 eggs", "1 tbsp butter", "salt"], "instructions": "Whisk and cook."},
+    ]
+
+
+def test_format_matches_llm_markdown():
+    text = format_recipes(RecipeIndex(CORPUS).match(["eggs", "butter"], k=1))
+    assert text.startswith("### Recipe: Omelette\n")
+    assert "- 3 eggs" in text and "1. Whisk.\n2. Cook." in text
+
+
+def test_shipped_corpus_loads():
+    index = RecipeIndex(load_recipes("data/recipes.json"))
+    assert len(index) > 10
+    assert index.match(["eggs", "milk", "butter"])[0]["coverage"] == 1.0
@@ -0,0 +1,60 @@
+import asyncio
+import json
+
+import pytest
+
+from recipe_stream import RecipeSplitter, iter_sse_deltas, sse_event
+
+
+async def alines(lines):
+    for line in lines:
+        yield line
+
+
+def collect(lines):
+    async def run():
+        return [delta async for delta in iter_sse_deltas(alines(lines))]
+    return asyncio.run(run())
+
+
+def data_line(content):
+    return "data: " + json.dumps({"choices": [{"delta": {"content": content}}]})
+
+
+def test_sse_deltas_skip_comments_and_stop_at_done():
+    lines = [
+        ": OPENROUTER PROCESSING",
+        "",
+        data_line("### Reci"),
+        "",
+        "data: {\"choices\": [{\"delta\": {\"role\": \"assistant\"}}]}",
+        data_line("pe: Soup"),
+        "data: [DONE]",
+        data_line("ignored"),
+    ]
+    assert collect(lines) == ["### Reci", "pe: Soup"]
+
+
+def test_sse_error_chunk_raises():
+    with pytest.raises(RuntimeError):
+        collect(['data: {"error": {"message": "rate limited"}}'])
+
+
+def test_splitter_cuts_at_marker_across_chunks():
+    splitter = RecipeSplitter()
+    out = []
+    for chunk in ["Sure! ", "### Rec", "ipe: Soup\nboil", "\n\n### Re", "cipe: Salad\ntoss"]:
+        out.extend(splitter.feed(chunk))
+    assert out == ["### Recipe: Soup\nboil"]
+    assert splitter.flush() == ["### Recipe: Salad\ntoss"]
+    assert splitter.flush() == []
+
+
+def test_splitter_without_marker_flushes_everything():
+    splitter = RecipeSplitter()
+    assert splitter.feed("just some text") == []
+    assert splitter.flush() == ["just some text"]
+
+
+def test_sse_event_format():
+    assert sse_event("recipe", {"index": 0}) == 'event: recipe\ndata: {"index": 0}\n\n'
@@ -0,0 +1,290 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from conftest import chat_completion
+
+
+def test_recipes_requires_auth(client):
+    assert client.get("/api/recipes").status_code == 422
+    assert client.get("/api/recipes", headers={"Authorization": "Bearer nope"}).status_code == 401
+
+
+def test_recipes_empty_pantry(client, llm, auth_headers):
+    resp = client.get("/api/recipes", headers=auth_headers)
+    assert resp.json() == {"recipes": "No pantry items found."}
+    assert llm.requests == []
+
+
+def test_recipes_prompt_built_from_pantry(client, db, llm, auth_headers):
+    db.seed("user-1", {"item": "eggs", "quantity": 2}, {"item": "milk", "quantity": 1, "unit": "cup"})
+    db.seed("someone-else", {"item": "caviar", "quantity": 1})
+    llm.handler = lambda request: httpx.Response(200, json=chat_completion("### Recipe: Omelette"))
+
+    resp = client.get("/api/recipes", headers=auth_headers)
+
+    assert resp.json() == {"recipes": "### Recipe: Omelette"}
+    sent = json.loads(llm.requests[0].content)
+    prompt = sent["messages"][1]["content"]
+    assert "2  eggs, 1 cup milk" in prompt
+    assert "caviar" not in prompt
+
+
+def test_recipes_upstream_error(client, db, llm, app_module, auth_headers):
+    db.seed("user-1", {"item": "eggs", "quantity": 2})
+    llm.handler = lambda request: httpx.Response(502, text="bad gateway")
+    resp = client.get("/api/recipes", headers=auth_headers)
+    assert resp.status_code == 502
+    assert resp.json()["detail"] == "AI provider returned HTTP 502: bad gateway"
+    assert len(llm.requests) == 3  # first try + LLM_MAX_RETRIES
+
+    def boom(request):
+        raise httpx.ConnectError("down")
+
+    app_module.llm_client.breaker.record_success()  # keep the breaker out of this one
+    llm.handler = boom
+    resp = client.get("/api/recipes", headers=auth_headers)
+    assert resp.status_code == 502
+    assert resp.json()["detail"] == "AI request failed: ConnectError('down')"
+
+
+def test_recipes_retry_transient_errors(client, db, llm, auth_headers):
+    db.seed("user-1", {"item": "eggs", "quantity": 2})
+    responses = iter([
+        httpx.Response(429, text="slow down", headers={"Retry-After": "1"}),
+        httpx.Response(503, text="busy"),
+        httpx.Response(200, json=chat_completion("### Recipe: Omelette")),
+    ])
+    llm.handler = lambda request: next(responses)
+    assert client.get("/api/recipes", headers=auth_headers).json() == {"recipes": "### Recipe: Omelette"}
+
+
+def test_recipes_rate_limited_is_503_with_retry_after(client, db, llm, auth_headers):
+    db.seed("user-1", {"item": "eggs", "quantity": 2})
+    llm.handler = lambda request: httpx.Response(429, text="slow down", headers={"Retry-After": "120"})
+    resp = client.get("/api/recipes", headers=auth_headers)
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == "120"
+    assert len(llm.requests) == 1  # longer than LLM_RETRY_AFTER_MAX: give up at once
+
+
+def test_recipes_fail_fast_while_circuit_open(client, db, llm, app_module, auth_headers):
+    db.seed("user-1", {"item": "eggs", "quantity": 2})
+    llm.handler = lambda request: httpx.Response(500, text="down")
+    for _ in range(2):
+        client.get("/api/recipes", headers=auth_headers)
+    sent = len(llm.requests)
+
+    resp = client.get("/api/recipes", headers=auth_headers)
+    assert app_module.llm_client.breaker.state == "open"
+    assert resp.status_code == 503 and "Retry-After" in resp.headers
+    assert len(llm.requests) == sent
+
+
+def sse_body(*contents):
+    lines = [": OPENROUTER PROCESSING", ""]
+    for content in contents:
+        lines += ["data: " + json.dumps({"choices": [{"delta": {"content": content}}]}), ""]
+    lines += ["data: [DONE]", ""]
+    return "\n".join(lines).encode()
+
+
+def parse_events(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_stream_emits_one_event_per_recipe(client, db, llm, auth_headers):
+    db.seed("user-1", {"item": "eggs", "quantity": 2})
+    llm.handler = lambda request: httpx.Response(
+        200, content=sse_body("### Recipe: A\nstep", "\n### Recipe:", " B\nstep"),
+        headers={"Content-Type": "text/event-stream"},
+    )
+
+    resp = client.get("/api/recipes/stream", headers=auth_headers)
+
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    assert json.loads(llm.requests[0].content)["stream"] is True
+    assert parse_events(resp.text) == [
+        ("recipe", {"index": 0, "recipe": "### Recipe: A\nstep"}),
+        ("recipe", {"index": 1, "recipe": "### Recipe: B\nstep"}),
+        ("done", {"count": 2}),
+    ]
+
+
+def test_stream_empty_pantry(client, llm, auth_headers):
+    resp = client.get("/api/recipes/stream", headers=auth_headers)
+    assert parse_events(resp.text) == [("done", {"count": 0, "detail": "No pantry items found."})]
+    assert llm.requests == []
+
+
+def test_stream_upstream_error_event(client, db, llm, auth_headers):
+    db.seed("user-1", {"item": "eggs", "quantity": 2})
+    llm.handler = lambda request: httpx.Response(429, text="slow down")
+    [(event, data)] = parse_events(client.get("/api/recipes/stream", headers=auth_headers).text)
+    assert event == "error" and data["status"] == 503
+    assert data["detail"] == "AI provider returned HTTP 429: slow down"
+
+
+class TrackingStream(httpx.AsyncByteStream):
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.sent = 0
+        self.closed = False
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            self.sent += 1
+            yield chunk
+
+    async def aclose(self):
+        self.closed = True
+
+
+class DisconnectingRequest:
+    def __init__(self, after):
+        self.checks = 0
+        self.after = after
+
+    async def is_disconnected(self):
+        self.checks += 1
+        return self.checks > self.after
+
+
+def test_stream_client_disconnect_closes_upstream(app_module, llm):
+    chunks = [("data: " + json.dumps({"choices": [{"delta": {"content": f"### Recipe: {i}\n"}}]}) + "\n\n").encode()
+              for i in range(50)]
+    upstream = TrackingStream(chunks)
+    llm.handler = lambda request: httpx.Response(200, stream=upstream)
+
+    async def consume():
+        return [event async for event in app_module.stream_recipe_events(DisconnectingRequest(after=3), "prompt")]
+
+    events = asyncio.run(consume())
+
+    assert upstream.closed
+    assert upstream.sent < len(chunks)
+    assert len(events) == 2  # recipes 0 and 1 completed before the client left; no "done"
+
+
+def test_recipes_cached_until_pantry_changes(client, db, llm, auth_headers, metrics_headers):
+    db.seed("user-1", {"item": "eggs", "quantity": 2})
+    llm.handler = lambda request: httpx.Response(200, json=chat_completion("### Recipe: Omelette"))
+
+    first = client.get("/api/recipes", headers=auth_headers).json()
+    second = client.get("/api/recipes", headers=auth_headers).json()
+    assert first == second == {"recipes": "### Recipe: Omelette"}
+    assert len(llm.requests) == 1
+
+    client.post("/pantry/add", json={"item": "cheese", "quantity": 1}, headers=auth_headers)
+    client.get("/api/recipes", headers=auth_headers)
+    assert len(llm.requests) == 2
+
+    stats = client.get("/api/recipes/cache", headers=metrics_headers).json()
+    assert (stats["hits"], stats["misses"], stats["invalidations"]) == (1, 2, 1)
+
+
+def test_stream_served_from_cache(client, db, llm, auth_headers):
+    db.seed("user-1", {"item": "eggs", "quantity": 2})
+    llm.handler = lambda request: httpx.Response(200, json=chat_completion("### Recipe: A\nx\n### Recipe: B\ny"))
+    client.get("/api/recipes", headers=auth_headers)
+
+    events = parse_events(client.get("/api/recipes/stream", headers=auth_headers).text)
+
+    assert len(llm.requests) == 1
+    assert events == [
+        ("recipe", {"index": 0, "recipe": "### Recipe: A\nx"}),
+        ("recipe", {"index": 1, "recipe": "### Recipe: B\ny"}),
+        ("done", {"count": 2, "cached": True}),
+    ]
+
+
+def test_completed_stream_populates_cache(client, db, llm, auth_headers):
+    db.seed("user-1", {"item": "eggs", "quantity": 2})
+    llm.handler = lambda request: httpx.Response(200, content=sse_body("### Recipe: A\nx"))
+    client.get("/api/recipes/stream", headers=auth_headers)
+
+    assert client.get("/api/recipes", headers=auth_headers).json() == {"recipes": "### Recipe: A\nx"}
+    assert len(llm.requests) == 1
+
+
+@pytest.fixture
+def corpus(app_module, monkeypatch):
+    from recipe_engine import RecipeIndex
+    index = RecipeIndex([
+        {"title": "Omelette", "ingredients": ["3 eggs", "1 tbsp butter", "salt"], "instructions": "Whisk and cook."},
+        {"title": "Egg Fried Rice", "ingredients": ["2 eggs", "rice", "soy sauce", "spring onions"], "instructions": "Fry."},
+    ])
+    monkeypatch.setattr(app_module, "recipe_index", index)
+    return index
+
+
+def test_local_engine_skips_llm(client, db, llm, corpus, auth_headers):
+    db.seed("user-1", {"item": "eggs", "quantity": 2}, {"item": "rice", "quantity": 1})
+
+    body = client.get("/api/recipes", params={"engine": "local"}, headers=auth_headers).json()
+
+    assert body["engine"] == "local"
+    assert body["recipes"].startswith("### Recipe: Omelette")
+    assert [(m["title"], m["coverage"]) for m in body["matches"]] == [("Omelette", 0.6667), ("Egg Fried Rice", 0.5)]
+    assert llm.requests == []
+
+
+def test_auto_uses_local_when_coverage_is_high(client, db, llm, corpus, auth_headers):
+    db.seed("user-1", {"item": "eggs", "quantity": 2}, {"item": "butter", "quantity": 1})
+    body = client.get("/api/recipes", params={"engine": "auto"}, headers=auth_headers).json()
+    assert body["engine"] == "local"
+    assert llm.requests == []
+
+
+def test_auto_asks_llm_when_coverage_is_low(client, db, llm, corpus, auth_headers):
+    db.seed("user-1", {"item": "eggs", "quantity": 2})
+    llm.handler = lambda request: httpx.Response(200, json=chat_completion("### Recipe: Shakshuka"))
+    body = client.get("/api/recipes", params={"engine": "auto"}, headers=auth_headers).json()
+    assert body == {"recipes": "### Recipe: Shakshuka", "engine": "llm"}
+
+
+def test_auto_falls_back_to_local_on_llm_error(client, db, llm, corpus, auth_headers):
+    db.seed("user-1", {"item": "eggs", "quantity": 2})
+    llm.handler = lambda request: httpx.Response(500, text="upstream broke")
+    body = client.get("/api/recipes", params={"engine": "auto"}, headers=auth_headers).json()
+    assert body["engine"] == "local"
+    assert body["matches"][0]["title"] == "Omelette"
+
+
+def test_auto_falls_back_to_local_when_llm_is_slow(client, db, llm, corpus, app_module, auth_headers, monkeypatch):
+    monkeypatch.setattr(app_module, "RECIPE_AUTO_LLM_TIMEOUT", 0.05)
+    db.seed("user-1", {"item": "eggs", "quantity": 2})
+
+    async def slow(request):
+        await asyncio.sleep(0.2)
+        return httpx.Response(200, json=chat_completion("### Recipe: Too late"))
+
+    llm.handler = slow
+    body = client.get("/api/recipes", params={"engine": "auto"}, headers=auth_headers).json()
+    assert body["engine"] == "local"
+
+
+def test_auto_without_local_match_surfaces_llm_error(client, db, llm, corpus, auth_headers):
+    db.seed("user-1", {"item": "caviar", "quantity": 1})
+    llm.handler = lambda request: httpx.Response(500, text="upstream broke")
+    assert client.get("/api/recipes", params={"engine": "auto"}, headers=auth_headers).status_code == 502
+
+
+def test_unknown_engine_rejected(client, auth_headers):
+    assert client.get("/api/recipes", params={"engine": "magic"}, headers=auth_headers).status_code == 422
+
+
+def test_empty_completion_is_an_error_and_not_cached(client, db, llm, auth_headers):
+    db.seed("user-1", {"item": "eggs", "quantity": 2})
+    llm.handler = lambda request: httpx.Response(200, json={"choices": []})
+    assert client.get("/api/recipes", headers=auth_headers).status_code == 502
+
+    llm.handler = lambda request: httpx.Response(200, json=chat_completion("### Recipe: Omelette"))
+    assert client.get("/api/recipes", headers=auth_headers).json() == {"recipes": "### Recipe: Omelette"}
+    assert len(llm.requests) == 2